@@ -1,13 +1,2341 @@
 #! /usr/bin/python3
 
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
+from tkinter import ttk, scrolledtext, messagebox, filedialog
 import asyncio
 import threading
+import concurrent.futures
+import csv
+import json
+import os
+import heapq
+import queue
+import random
+import re
+import sqlite3
+import stat
+import sys
+import tempfile
+import time
+import zipfile
+from array import array
+from collections import deque
 from bleak import BleakScanner, BleakClient
 from typing import Optional
 from datetime import datetime
 import argparse
+import bisect
+import importlib.util
+import ipaddress
+import itertools
+import operator
+import struct
+
+def advertisementFingerprint(device, advData):
+    """Hash the advertisement content used for filtering and decoding (RSSI is excluded)"""
+    return hash((
+        device.name,
+        advData.local_name,
+        tuple(sorted(advData.manufacturer_data.items())),
+        tuple(sorted(advData.service_data.items())),
+        tuple(sorted(advData.service_uuids)),
+    ))
+
+def advertisementDiff(oldAdv, newAdv):
+    """Describe what changed between two advertisements of the same device"""
+    changes = []
+    if oldAdv.local_name != newAdv.local_name:
+        changes.append(f"name: {oldAdv.local_name!r} -> {newAdv.local_name!r}")
+    for uuid in sorted(set(newAdv.service_uuids) - set(oldAdv.service_uuids)):
+        changes.append(f"+uuid {uuid}")
+    for uuid in sorted(set(oldAdv.service_uuids) - set(newAdv.service_uuids)):
+        changes.append(f"-uuid {uuid}")
+    for label, oldItems, newItems in (
+        ("svc", oldAdv.service_data, newAdv.service_data),
+        ("mfr", oldAdv.manufacturer_data, newAdv.manufacturer_data),
+    ):
+        for key in sorted(set(oldItems) | set(newItems), key=str):
+            oldValue = oldItems.get(key)
+            newValue = newItems.get(key)
+            if oldValue == newValue:
+                continue
+            keyStr = f"0x{key:04x}" if isinstance(key, int) else key
+            oldHex = oldValue.hex(" ") if oldValue is not None else "-"
+            newHex = newValue.hex(" ") if newValue is not None else "-"
+            changes.append(f"{label} {keyStr}: {oldHex} -> {newHex}")
+    return "; ".join(changes)
+
+DEVICE_CACHE_MAX_AGE = 120.0  # Seconds a scanned BLEDevice is reused for direct connections
+RECONNECT_INITIAL_DELAY = 0.5  # Seconds
+RECONNECT_MAX_DELAY = 30.0  # Seconds
+
+def sigUuid(shortUuid):
+    """Expand a 16-bit Bluetooth SIG UUID into its full 128-bit string form"""
+    return f"0000{shortUuid:04x}-0000-1000-8000-00805f9b34fb"
+
+# Advertisement payload parsers, keyed by company ID (manufacturer data) and by
+# full 128-bit UUID (service data). A parser takes the raw payload bytes and
+# returns a dict of decoded fields (including a "format" name), or None when
+# the payload is not in a format it understands.
+manufacturerDataParsers = {}
+serviceDataParsers = {}
+
+def manufacturerDataParser(companyId):
+    """Decorator registering a manufacturer data parser for a company ID"""
+    def register(parser):
+        manufacturerDataParsers[companyId] = parser
+        return parser
+    return register
+
+def serviceDataParser(uuid):
+    """Decorator registering a service data parser for a 16-bit or 128-bit service UUID"""
+    def register(parser):
+        serviceDataParsers[sigUuid(uuid) if isinstance(uuid, int) else uuid.lower()] = parser
+        return parser
+    return register
+
+def loadAdvertisementParsers(path):
+    """Load vendor parsers from a Python file defining MANUFACTURER_PARSERS and/or SERVICE_DATA_PARSERS dicts"""
+    spec = importlib.util.spec_from_file_location(f"bleExpParsers_{len(manufacturerDataParsers)}_{len(serviceDataParsers)}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    for companyId, parser in getattr(module, "MANUFACTURER_PARSERS", {}).items():
+        manufacturerDataParser(companyId)(parser)
+    for uuid, parser in getattr(module, "SERVICE_DATA_PARSERS", {}).items():
+        serviceDataParser(uuid)(parser)
+
+def decodeAdvertisement(advData):
+    """Run the registered parsers over the manufacturer and service data of an advertisement
+
+    Malformed payloads are skipped. A parser that fails any other way (e.g. a
+    bug in a vendor parser) gives a "decode error" entry with the exception.
+    Entries without a "format" are labelled with the name of their parser.
+    """
+    decoded = []
+    for source, parsers, items in (
+        ("mfr", manufacturerDataParsers, advData.manufacturer_data),
+        ("svc", serviceDataParsers, advData.service_data),
+    ):
+        for key, data in items.items():
+            parser = parsers.get(key)
+            if parser is None:
+                continue
+            try:
+                fields = parser(bytes(data))
+                if fields is not None and not isinstance(fields, dict):
+                    raise TypeError(f"parser returned {type(fields).__name__}, not dict")
+            except (struct.error, ValueError, IndexError):
+                fields = None
+            except Exception as e:
+                fields = {"format": "decode error", "error": f"{type(e).__name__}: {e}"}
+            if fields:
+                fields.setdefault("format", getattr(parser, "__name__", "vendor"))
+                fields["source"] = f"{source} 0x{key:04x}" if isinstance(key, int) else f"{source} {key}"
+                decoded.append(fields)
+    return decoded
+
+IBEACON_STRUCT = struct.Struct(">BB16sHHb")
+
+@manufacturerDataParser(0x004c)
+def parseIBeacon(data):
+    """Apple iBeacon: type 0x02, length 0x15, proximity UUID, major, minor, measured power"""
+    if len(data) < IBEACON_STRUCT.size or data[0] != 0x02 or data[1] != 0x15:
+        return None
+    _, _, proximityUuid, major, minor, txPower = IBEACON_STRUCT.unpack_from(data)
+    uuidHex = proximityUuid.hex()
+    return {
+        "format": "iBeacon",
+        "uuid": f"{uuidHex[0:8]}-{uuidHex[8:12]}-{uuidHex[12:16]}-{uuidHex[16:20]}-{uuidHex[20:32]}",
+        "major": major,
+        "minor": minor,
+        "tx_power": txPower,
+    }
+
+RUUVI_RAWV2_STRUCT = struct.Struct(">BhHHhhhHBH6s")
+
+@manufacturerDataParser(0x0499)
+def parseRuuviRawV2(data):
+    """Ruuvi Innovations sensor tag, data format 5 (RAWv2)"""
+    if len(data) < RUUVI_RAWV2_STRUCT.size or data[0] != 0x05:
+        return None
+    (_, temperature, humidity, pressure, accX, accY, accZ,
+     powerInfo, movementCounter, sequence, mac) = RUUVI_RAWV2_STRUCT.unpack_from(data)
+    return {
+        "format": "Ruuvi RAWv2",
+        "temperature_c": round(temperature * 0.005, 3),
+        "humidity_pct": round(humidity * 0.0025, 4),
+        "pressure_pa": pressure + 50000,
+        "acceleration_mg": [accX, accY, accZ],
+        "battery_mv": (powerInfo >> 5) + 1600,
+        "tx_power": (powerInfo & 0x1f) * 2 - 40,
+        "movement_counter": movementCounter,
+        "sequence": sequence,
+        "mac": mac.hex(":"),
+    }
+
+EDDYSTONE_UID_STRUCT = struct.Struct(">Bb10s6s")
+EDDYSTONE_TLM_STRUCT = struct.Struct(">BBHhII")
+EDDYSTONE_URL_SCHEMES = ("http://www.", "https://www.", "http://", "https://")
+EDDYSTONE_URL_EXPANSIONS = (
+    ".com/", ".org/", ".edu/", ".net/", ".info/", ".biz/", ".gov/",
+    ".com", ".org", ".edu", ".net", ".info", ".biz", ".gov",
+)
+
+@serviceDataParser(0xfeaa)
+def parseEddystone(data):
+    """Google Eddystone UID, URL, TLM and EID frames"""
+    frameType = data[0]
+    if frameType == 0x00:
+        _, txPower, namespace, instance = EDDYSTONE_UID_STRUCT.unpack_from(data)
+        return {"format": "Eddystone-UID", "tx_power": txPower, "namespace": namespace.hex(), "instance": instance.hex()}
+    if frameType == 0x10:
+        txPower = struct.unpack_from(">b", data, 1)[0]
+        url = EDDYSTONE_URL_SCHEMES[data[2]]
+        for b in data[3:]:
+            url += EDDYSTONE_URL_EXPANSIONS[b] if b < len(EDDYSTONE_URL_EXPANSIONS) else chr(b)
+        return {"format": "Eddystone-URL", "tx_power": txPower, "url": url}
+    if frameType == 0x20 and data[1] == 0x00:
+        _, _, batteryMv, temperature, advCount, secCount = EDDYSTONE_TLM_STRUCT.unpack_from(data)
+        return {
+            "format": "Eddystone-TLM",
+            "battery_mv": batteryMv,
+            "temperature_c": temperature / 256.0,
+            "adv_count": advCount,
+            "uptime_s": secCount / 10.0,
+        }
+    if frameType == 0x30:
+        txPower = struct.unpack_from(">b", data, 1)[0]
+        return {"format": "Eddystone-EID", "tx_power": txPower, "eid": data[2:10].hex()}
+    return None
+
+def formatDecodedFields(fields):
+    """Format decoded advertisement or characteristic fields as a single line"""
+    return ", ".join(f"{k}={v}" for k, v in fields.items() if k not in ("format", "source"))
+
+# Characteristic value decoders, keyed by full 128-bit characteristic UUID. A
+# decoder takes the raw value bytes and returns a dict of decoded fields, or
+# None when the value can't be decoded.
+characteristicDecoders = {}
+
+def characteristicDecoder(uuid):
+    """Decorator registering a value decoder for a 16-bit or 128-bit characteristic UUID"""
+    def register(decoder):
+        characteristicDecoders[sigUuid(uuid) if isinstance(uuid, int) else uuid.lower()] = decoder
+        return decoder
+    return register
+
+def loadCharacteristicDecoders(path):
+    """Load vendor decoders from a Python file defining a CHARACTERISTIC_DECODERS dict"""
+    spec = importlib.util.spec_from_file_location(f"bleExpDecoders_{len(characteristicDecoders)}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    for uuid, decoder in getattr(module, "CHARACTERISTIC_DECODERS", {}).items():
+        characteristicDecoder(uuid)(decoder)
+
+def decodeCharacteristic(decoder, data):
+    """Run a characteristic decoder, returning None if the value is malformed
+
+    A decoder that fails any other way (e.g. a bug in a vendor decoder) gives
+    a "decode_error" field with the exception, rather than breaking the
+    read or notification path.
+    """
+    try:
+        fields = decoder(bytes(data)) or None
+        if fields is not None and not isinstance(fields, dict):
+            raise TypeError(f"decoder returned {type(fields).__name__}, not dict")
+        return fields
+    except (struct.error, ValueError, IndexError):
+        return None
+    except Exception as e:
+        return {"decode_error": f"{type(e).__name__}: {e}"}
+
+def shortUuid(uuid):
+    """Shorten a Bluetooth SIG base UUID to its 16-bit form (other UUIDs are returned unchanged)"""
+    if "#" in uuid:
+        # Characteristic label with an instance number (UUID#N)
+        uuid, _, instance = uuid.partition("#")
+        return f"{shortUuid(uuid)}#{instance}"
+    if len(uuid) == 36 and uuid.startswith("0000") and uuid.endswith("-0000-1000-8000-00805f9b34fb"):
+        return uuid[4:8]
+    return uuid
+
+class FieldReader:
+    """Sequential little-endian reader for the optional fields of GATT measurement values"""
+    def __init__(self, data, offset=0):
+        self.data = data
+        self.offset = offset
+
+    def read(self, fmt):
+        value = struct.unpack_from("<" + fmt, self.data, self.offset)[0]
+        self.offset += struct.calcsize(fmt)
+        return value
+
+    def uint24(self):
+        if self.offset + 3 > len(self.data):
+            raise IndexError("Value too short")
+        value = int.from_bytes(self.data[self.offset:self.offset + 3], 'little')
+        self.offset += 3
+        return value
+
+@characteristicDecoder(0x2a19)
+def decodeBatteryLevel(data):
+    """Battery Level"""
+    return {"battery_level_pct": data[0]}
+
+@characteristicDecoder(0x2a37)
+def decodeHeartRateMeasurement(data):
+    """Heart Rate Measurement"""
+    flags = data[0]
+    reader = FieldReader(data, 1)
+    fields = {"heart_rate_bpm": reader.read("H" if flags & 0x01 else "B")}
+    if flags & 0x04:
+        fields["sensor_contact"] = bool(flags & 0x02)
+    if flags & 0x08:
+        fields["energy_expended_kj"] = reader.read("H")
+    if flags & 0x10:
+        rrIntervals = []
+        while reader.offset + 2 <= len(data):
+            rrIntervals.append(round(reader.read("H") / 1024.0, 4))
+        fields["rr_intervals_s"] = rrIntervals
+        if rrIntervals:
+            fields["rr_interval_s"] = rrIntervals[-1]
+    return fields
+
+@characteristicDecoder(0x2a5b)
+def decodeCscMeasurement(data):
+    """CSC Measurement (Cycling Speed and Cadence)"""
+    flags = data[0]
+    reader = FieldReader(data, 1)
+    fields = {}
+    if flags & 0x01:
+        fields["cumulative_wheel_revs"] = reader.read("I")
+        fields["last_wheel_event_time_s"] = reader.read("H") / 1024.0
+    if flags & 0x02:
+        fields["cumulative_crank_revs"] = reader.read("H")
+        fields["last_crank_event_time_s"] = reader.read("H") / 1024.0
+    return fields
+
+@characteristicDecoder(0x2a63)
+def decodeCyclingPowerMeasurement(data):
+    """Cycling Power Measurement (leading fields, up to the crank revolution data)"""
+    flags = struct.unpack_from("<H", data, 0)[0]
+    reader = FieldReader(data, 2)
+    fields = {"instantaneous_power_w": reader.read("h")}
+    if flags & 0x0001:
+        fields["pedal_power_balance_pct"] = reader.read("B") / 2.0
+    if flags & 0x0004:
+        fields["accumulated_torque_nm"] = reader.read("H") / 32.0
+    if flags & 0x0010:
+        fields["cumulative_wheel_revs"] = reader.read("I")
+        fields["last_wheel_event_time_s"] = reader.read("H") / 2048.0
+    if flags & 0x0020:
+        fields["cumulative_crank_revs"] = reader.read("H")
+        fields["last_crank_event_time_s"] = reader.read("H") / 1024.0
+    return fields
+
+@characteristicDecoder(0x2ad2)
+def decodeIndoorBikeData(data):
+    """FTMS Indoor Bike Data"""
+    flags = struct.unpack_from("<H", data, 0)[0]
+    reader = FieldReader(data, 2)
+    fields = {}
+    # Bit 0 is "More Data": the instantaneous speed is present when it is NOT set
+    if not flags & 0x0001:
+        fields["instantaneous_speed_kmh"] = reader.read("H") / 100.0
+    if flags & 0x0002:
+        fields["average_speed_kmh"] = reader.read("H") / 100.0
+    if flags & 0x0004:
+        fields["instantaneous_cadence_rpm"] = reader.read("H") / 2.0
+    if flags & 0x0008:
+        fields["average_cadence_rpm"] = reader.read("H") / 2.0
+    if flags & 0x0010:
+        fields["total_distance_m"] = reader.uint24()
+    if flags & 0x0020:
+        fields["resistance_level"] = reader.read("h")
+    if flags & 0x0040:
+        fields["instantaneous_power_w"] = reader.read("h")
+    if flags & 0x0080:
+        fields["average_power_w"] = reader.read("h")
+    if flags & 0x0100:
+        fields["total_energy_kcal"] = reader.read("H")
+        fields["energy_per_hour_kcal"] = reader.read("H")
+        fields["energy_per_minute_kcal"] = reader.read("B")
+    if flags & 0x0200:
+        fields["heart_rate_bpm"] = reader.read("B")
+    if flags & 0x0400:
+        fields["metabolic_equivalent"] = reader.read("B") / 10.0
+    if flags & 0x0800:
+        fields["elapsed_time_s"] = reader.read("H")
+    if flags & 0x1000:
+        fields["remaining_time_s"] = reader.read("H")
+    return fields
+
+@characteristicDecoder(0x2ad9)
+def decodeFitnessMachineControlPoint(data):
+    """FTMS Fitness Machine Control Point (response indications)"""
+    if data[0] != 0x80 or len(data) < 3:
+        return {"op_code": data[0]}
+    return {"op_code": data[0], "request_op_code": data[1], "result_code": data[2]}
+
+def advertisementFields(advData, decoded):
+    """Convert an advertisement and its decoded payloads into JSON-friendly capture fields"""
+    return {
+        "name": advData.local_name,
+        "rssi": advData.rssi,
+        "service_uuids": list(advData.service_uuids),
+        "service_data": {uuid: data.hex() for uuid, data in advData.service_data.items()},
+        "manufacturer_data": {f"0x{cid:04x}": data.hex() for cid, data in advData.manufacturer_data.items()},
+        "decoded": decoded,
+    }
+
+def makeEvent(kind, device, char, data, fields=None, monoNs=None):
+    """Build a session event tuple (mono_ns, wall_ns, kind, device, char, data, fields)
+
+    monoNs should be taken at callback entry when available, so that the event
+    time doesn't include any processing delay.
+    """
+    return (monoNs or time.monotonic_ns(), time.time_ns(), kind, device, char, bytes(data), fields)
+
+def jsonFallback(value):
+    """Serialize the values JSON can't (e.g. bytes returned by a vendor decoder): bytes as hex, others as text"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return str(value)
+
+def eventToDict(event):
+    """Convert a session event tuple into its JSON-friendly dict form"""
+    monoNs, wallNs, kind, device, char, data, fields = event
+    return {"mono_ns": monoNs, "wall_ns": wallNs, "kind": kind, "device": device, "char": char, "data": data.hex(), "fields": fields or {}}
+
+class SessionCapture:
+    """Spool of session events (advertisements, reads, writes, notifications) in JSON Lines format
+
+    Events are queued by the BLE event loop and written by a background thread,
+    so recording an event never blocks on file I/O.
+    """
+    def __init__(self, path=None):
+        self.temporary = path is None
+        if self.temporary:
+            fd, path = tempfile.mkstemp(prefix="bleExp-capture-", suffix=".jsonl")
+            os.close(fd)
+        self.path = path
+        self.eventCount = 0
+        self.queue = queue.SimpleQueue()
+        self.fileHandle = open(self.path, 'a', encoding='utf-8')
+        self.thread = threading.Thread(target=self._writer, daemon=True)
+        self.thread.start()
+
+    def record(self, event):
+        """Queue an event tuple built by makeEvent()"""
+        self.eventCount += 1
+        self.queue.put(event)
+
+    def flush(self):
+        """Block until all queued events have been written"""
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+
+    def close(self, remove=False):
+        """Stop the writer thread and close the spool file"""
+        self.queue.put(None)
+        self.thread.join()
+        self.fileHandle.close()
+        if remove:
+            os.remove(self.path)
+
+    def _writer(self):
+        while True:
+            item = self.queue.get()
+            lines = []
+            try:
+                # Write in batches to keep the number of syscalls low
+                while True:
+                    if item is None or isinstance(item, threading.Event):
+                        break
+                    try:
+                        lines.append(json.dumps(eventToDict(item), default=jsonFallback) + "\n")
+                    except Exception as e:
+                        print(f"Warning: Could not capture a {item[2]} event: {e}")
+                    if len(lines) >= 1000:
+                        break
+                    try:
+                        item = self.queue.get_nowait()
+                    except queue.Empty:
+                        item = False
+                        break
+                if lines:
+                    self.fileHandle.write("".join(lines))
+                    self.fileHandle.flush()
+            except Exception as e:
+                print(f"Warning: Could not write to the capture file: {e}")
+            finally:
+                # Waiters are always released, even if the batch couldn't be written
+                if isinstance(item, threading.Event):
+                    item.set()
+            if item is None:
+                return
+
+class LogFileWriter:
+    """Log file appended by a background thread
+
+    Lines are queued by whichever thread logs (the BLE event loop for the
+    notifications), so logging never blocks on file I/O.
+    """
+    def __init__(self, path):
+        self.queue = queue.SimpleQueue()
+        self.fileHandle = open(path, 'a', encoding='utf-8')
+        self.thread = threading.Thread(target=self._writer, daemon=True)
+        self.thread.start()
+
+    def write(self, text):
+        """Queue text to be appended to the log file (thread-safe)"""
+        self.queue.put(text)
+
+    def close(self):
+        """Write the queued text, stop the writer thread and close the log file"""
+        self.queue.put(None)
+        self.thread.join()
+        self.fileHandle.close()
+
+    def _writer(self):
+        while True:
+            item = self.queue.get()
+            texts = []
+            # Write in batches to keep the number of syscalls low
+            while item is not None:
+                texts.append(item)
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                if texts:
+                    self.fileHandle.write("".join(texts))
+                    self.fileHandle.flush()
+            except Exception as e:
+                print(f"Error writing to log file: {e}")
+            if item is None:
+                return
+
+def iterCaptureChunks(path, chunkSize=65536):
+    """Read a capture spool file as lists of event dicts, chunkSize events at a time"""
+    chunk = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            chunk.append(json.loads(line))
+            if len(chunk) >= chunkSize:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+EXPORT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".json": "jsonl", ".npz": "npz", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+EXPORT_COLUMNS = ["mono_ns", "wall_ns", "wall_time", "kind", "device", "char", "data", "fields"]
+
+def wallTimeString(wallNs):
+    """Format a wall clock timestamp in nanoseconds as an ISO 8601 string with microseconds"""
+    return datetime.fromtimestamp(wallNs / 1e9).isoformat(timespec='microseconds')
+
+def exportCapture(capturePath, outputPath, exportFormat=None, chunkSize=65536, progress=None):
+    """Stream a capture spool file into CSV, JSON Lines, NumPy .npz, Parquet or Arrow format
+
+    Events are converted chunkSize at a time, so captures larger than the
+    available memory can be exported. Returns the number of exported events.
+    """
+    if exportFormat is None:
+        exportFormat = EXPORT_FORMATS.get(os.path.splitext(outputPath)[1].lower())
+        if exportFormat is None:
+            raise ValueError(f"Cannot infer the export format from '{outputPath}'")
+    writer = {
+        "csv": _exportCsv,
+        "jsonl": _exportJsonLines,
+        "npz": _exportNpz,
+        "parquet": _exportArrow,
+        "arrow": _exportArrow,
+    }.get(exportFormat)
+    if writer is None:
+        raise ValueError(f"Unknown export format: {exportFormat}")
+
+    exported = [0]
+
+    def chunks():
+        for chunk in iterCaptureChunks(capturePath, chunkSize):
+            yield chunk
+            exported[0] += len(chunk)
+            if progress:
+                progress(exported[0])
+
+    writer(chunks(), outputPath, exportFormat)
+    return exported[0]
+
+def _exportCsv(chunks, outputPath, exportFormat):
+    with open(outputPath, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_COLUMNS)
+        for chunk in chunks:
+            writer.writerows(
+                [e["mono_ns"], e["wall_ns"], wallTimeString(e["wall_ns"]), e["kind"], e["device"] or "",
+                 e["char"] or "", e["data"], json.dumps(e["fields"]) if e["fields"] else ""]
+                for e in chunk
+            )
+
+def _exportJsonLines(chunks, outputPath, exportFormat):
+    with open(outputPath, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            for e in chunk:
+                e["wall_time"] = wallTimeString(e["wall_ns"])
+            f.write("".join(json.dumps(e) + "\n" for e in chunk))
+
+def _exportNpz(chunks, outputPath, exportFormat):
+    """Write each chunk as a set of column arrays (e.g. mono_ns_00000.npy) inside the .npz archive
+
+    The raw bytes of each chunk are stored concatenated in a uint8 array, with
+    an int64 offsets array (one entry per event, plus the end offset).
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise RuntimeError("Exporting to .npz requires NumPy (pip install numpy)")
+    with zipfile.ZipFile(outputPath, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        for index, chunk in enumerate(chunks):
+            payloads = [bytes.fromhex(e["data"]) for e in chunk]
+            offsets = np.zeros(len(payloads) + 1, dtype=np.int64)
+            np.cumsum([len(p) for p in payloads], out=offsets[1:])
+            columns = {
+                "mono_ns": np.array([e["mono_ns"] for e in chunk], dtype=np.int64),
+                "wall_ns": np.array([e["wall_ns"] for e in chunk], dtype=np.int64),
+                "kind": np.array([e["kind"] for e in chunk], dtype=np.str_),
+                "device": np.array([e["device"] or "" for e in chunk], dtype=np.str_),
+                "char": np.array([e["char"] or "" for e in chunk], dtype=np.str_),
+                "data": np.frombuffer(b"".join(payloads), dtype=np.uint8),
+                "data_offsets": offsets,
+                "fields": np.array([json.dumps(e["fields"]) if e["fields"] else "" for e in chunk], dtype=np.str_),
+            }
+            for name, array in columns.items():
+                with zf.open(f"{name}_{index:05d}.npy", 'w', force_zip64=True) as member:
+                    np.lib.format.write_array(member, array, allow_pickle=False)
+
+def _exportArrow(chunks, outputPath, exportFormat):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        import pyarrow.ipc
+    except ImportError:
+        raise RuntimeError(f"Exporting to {exportFormat} requires pyarrow (pip install pyarrow)")
+    schema = pa.schema([
+        ("mono_ns", pa.int64()),
+        ("wall_ns", pa.int64()),
+        ("wall_time", pa.timestamp("ns")),
+        ("kind", pa.string()),
+        ("device", pa.string()),
+        ("char", pa.string()),
+        ("data", pa.binary()),
+        ("fields", pa.string()),
+    ])
+    if exportFormat == "parquet":
+        writer = pq.ParquetWriter(outputPath, schema)
+        writeChunk = writer.write_table
+    else:
+        writer = pyarrow.ipc.new_file(outputPath, schema)
+        writeChunk = writer.write_table
+    try:
+        for chunk in chunks:
+            wallNs = [e["wall_ns"] for e in chunk]
+            table = pa.table({
+                "mono_ns": [e["mono_ns"] for e in chunk],
+                "wall_ns": wallNs,
+                "wall_time": pa.array(wallNs, type=pa.int64()).cast(pa.timestamp("ns")),
+                "kind": [e["kind"] for e in chunk],
+                "device": [e["device"] for e in chunk],
+                "char": [e["char"] for e in chunk],
+                "data": [bytes.fromhex(e["data"]) for e in chunk],
+                "fields": [json.dumps(e["fields"]) if e["fields"] else None for e in chunk],
+            }, schema=schema)
+            writeChunk(table)
+    finally:
+        writer.close()
+
+EVENT_KINDS = ("adv", "read", "write", "notify", "reply", "link", "mark")
+BINARY_FRAME_HEADER = struct.Struct(">IQQBBBH")
+
+def encodeEventFrame(event, publishFormat):
+    """Encode a session event as a JSON line, or as a length-prefixed binary frame
+
+    The binary frame is a big-endian header (length of the rest of the frame,
+    mono_ns, wall_ns, kind index in EVENT_KINDS, device length, characteristic
+    length, fields length) followed by the device, characteristic and JSON
+    fields strings (UTF-8) and the raw data bytes. Raises ValueError if a
+    string is too long for its length field.
+    """
+    if publishFormat == "jsonl":
+        return (json.dumps(eventToDict(event), default=jsonFallback) + "\n").encode('utf-8')
+    monoNs, wallNs, kind, device, char, data, fields = event
+    deviceBytes = (device or "").encode('utf-8')
+    charBytes = (char or "").encode('utf-8')
+    fieldsBytes = json.dumps(fields, default=jsonFallback).encode('utf-8') if fields else b""
+    if len(deviceBytes) > 0xff or len(charBytes) > 0xff or len(fieldsBytes) > 0xffff:
+        raise ValueError(f"{kind} event too large for a binary frame")
+    length = BINARY_FRAME_HEADER.size - 4 + len(deviceBytes) + len(charBytes) + len(fieldsBytes) + len(data)
+    header = BINARY_FRAME_HEADER.pack(length, monoNs, wallNs, EVENT_KINDS.index(kind), len(deviceBytes), len(charBytes), len(fieldsBytes))
+    return b"".join((header, deviceBytes, charBytes, fieldsBytes, data))
+
+def isLoopbackHost(host):
+    """Tell whether a host name or address only accepts local connections"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host.strip("[]")).is_loopback
+    except ValueError:
+        return False
+
+class EventSubscriber:
+    """A connected client of the event publisher, with a bounded drop-oldest queue"""
+    def __init__(self, reader, writer, queueSize):
+        self.reader = reader
+        self.writer = writer
+        self.frames = deque(maxlen=queueSize)
+        self.wakeup = asyncio.Event()
+        self.wakePending = False
+        self.sent = 0
+        self.dropped = 0
+        self.tasks = ()
+
+class EventPublisher:
+    """Local publish endpoint streaming session events to any number of subscribers
+
+    The endpoint is either a Unix domain socket ("unix:/path/to/socket") or a
+    localhost TCP port ("tcp:PORT" or "tcp:HOST:PORT"). Subscribers can send
+    back JSON line commands, which are handed to commandHandler. As these
+    commands reach the device and aren't authenticated, TCP endpoints are
+    limited to loopback hosts unless allowRemote is set.
+
+    bleExp runs a new BLE event loop for every scan and connection, so the
+    endpoint is served from its own event loop thread, which lets subscribers
+    stay connected across scans and reconnections. publish() never blocks: it
+    only appends the encoded frame to each subscriber's bounded queue (dropping
+    the oldest frame when the queue is full) and wakes up its writer.
+    """
+    def __init__(self, endpoint, publishFormat="jsonl", queueSize=1024, commandHandler=None, allowRemote=False):
+        self.endpoint = endpoint
+        self.allowRemote = allowRemote
+        self.publishFormat = publishFormat
+        self.queueSize = queueSize
+        self.commandHandler = commandHandler
+        self.subscribers = frozenset()  # Replaced (never mutated) so publish() can iterate it from any thread
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+        started = concurrent.futures.Future()
+        self.thread = threading.Thread(target=self._run, args=(started,), daemon=True)
+        self.thread.start()
+        # Propagate bind errors to the caller
+        started.result()
+
+    def _run(self, started):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(self._startServer())
+        except Exception as e:
+            started.set_exception(e)
+            return
+        started.set_result(True)
+        self.loop.run_forever()
+
+    async def _startServer(self):
+        scheme, _, location = self.endpoint.partition(":")
+        if scheme == "unix":
+            # Only a stale socket is replaced, never a regular file
+            if os.path.lexists(location):
+                if not stat.S_ISSOCK(os.lstat(location).st_mode):
+                    raise ValueError(f"'{location}' exists and is not a socket")
+                os.remove(location)
+            return await asyncio.start_unix_server(self._serveSubscriber, path=location)
+        if scheme == "tcp":
+            host, _, port = location.rpartition(":")
+            host = host or "127.0.0.1"
+            if not self.allowRemote and not isLoopbackHost(host):
+                raise ValueError(f"'{host}' is not a loopback address (use --publish-remote to accept remote subscribers)")
+            return await asyncio.start_server(self._serveSubscriber, host=host, port=int(port))
+        raise ValueError(f"Invalid publish endpoint '{self.endpoint}' (expected unix:PATH or tcp:[HOST:]PORT)")
+
+    def publish(self, event):
+        """Queue an event for all subscribers (thread-safe, never blocks)"""
+        if not self.subscribers:
+            return
+        try:
+            frame = encodeEventFrame(event, self.publishFormat)
+        except Exception as e:
+            # Drop the event, rather than break the callback that recorded it
+            print(f"Warning: Could not publish a {event[2]} event: {e}")
+            return
+        for subscriber in self.subscribers:
+            self._queueFrame(subscriber, frame)
+
+    def _queueFrame(self, subscriber, frame):
+        if len(subscriber.frames) == self.queueSize:
+            subscriber.dropped += 1
+        subscriber.frames.append(frame)
+        if not subscriber.wakePending:
+            subscriber.wakePending = True
+            self.loop.call_soon_threadsafe(subscriber.wakeup.set)
+
+    async def _serveSubscriber(self, reader, writer):
+        subscriber = EventSubscriber(reader, writer, self.queueSize)
+        self.subscribers = self.subscribers | {subscriber}
+        senderTask = asyncio.ensure_future(self._sendFrames(subscriber))
+        subscriber.tasks = (asyncio.current_task(), senderTask)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._handleCommand(subscriber, line)
+        except ConnectionError:
+            pass
+        finally:
+            self.subscribers = self.subscribers - {subscriber}
+            senderTask.cancel()
+            writer.close()
+
+    async def _sendFrames(self, subscriber):
+        try:
+            while True:
+                await subscriber.wakeup.wait()
+                subscriber.wakeup.clear()
+                subscriber.wakePending = False
+                while subscriber.frames:
+                    subscriber.writer.write(subscriber.frames.popleft())
+                    subscriber.sent += 1
+                    await subscriber.writer.drain()
+        except ConnectionError:
+            subscriber.writer.close()
+
+    def _handleCommand(self, subscriber, line):
+        """Run a subscriber command, and send back a reply event"""
+        command = None
+        try:
+            command = json.loads(line)
+            if not isinstance(command, dict) or not self.commandHandler:
+                raise ValueError("Unsupported command")
+            reply = {"ok": True, "result": self.commandHandler(command)}
+        except Exception as e:
+            reply = {"ok": False, "error": str(e)}
+        reply["cmd"] = command.get("cmd") if isinstance(command, dict) else None
+        try:
+            frame = encodeEventFrame(makeEvent("reply", None, None, b"", reply), self.publishFormat)
+        except Exception as e:
+            reply = {"ok": False, "error": f"Could not encode the reply: {e}", "cmd": reply["cmd"]}
+            frame = encodeEventFrame(makeEvent("reply", None, None, b"", reply), self.publishFormat)
+        self._queueFrame(subscriber, frame)
+
+    def stats(self):
+        """Return (sent, dropped) frame counters of each subscriber"""
+        return [(s.sent, s.dropped) for s in self.subscribers]
+
+    def close(self):
+        """Close the endpoint and disconnect all subscribers"""
+        async def shutdown():
+            self.server.close()
+            # Aborting the connections (without flushing what slow subscribers
+            # haven't read) ends the subscriber tasks, as their reader gets EOF;
+            # wait for them, so none is left pending when the loop stops
+            tasks = []
+            for subscriber in self.subscribers:
+                subscriber.writer.transport.abort()
+                subscriber.tasks[1].cancel()  # The sender
+                tasks += subscriber.tasks
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.server.wait_closed()
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result(timeout=2.0)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.endpoint.startswith("unix:") and os.path.exists(self.endpoint[5:]):
+            os.remove(self.endpoint[5:])
+
+MERGE_REORDER_WINDOW = 1.0  # Seconds by which the events of one source may be out of order
+
+def iterCaptureEvents(path):
+    """Read a capture spool file one event dict at a time"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def _reorderSource(events, sourceIndex, windowNs, counters):
+    """Yield the (mono_ns, source, seq, event) merge keys of one time-ordered source
+
+    Events that are slightly out of order (by less than windowNs) are
+    re-ordered with a small heap; later stragglers are counted as late.
+    """
+    pending = []
+    lastNs = None
+    for seq, event in enumerate(events):
+        heapq.heappush(pending, (event["mono_ns"], sourceIndex, seq, event))
+        while pending and pending[0][0] <= event["mono_ns"] - windowNs:
+            item = heapq.heappop(pending)
+            if lastNs is not None and item[0] < lastNs:
+                counters["late"] += 1
+            lastNs = item[0]
+            yield item
+    while pending:
+        item = heapq.heappop(pending)
+        if lastNs is not None and item[0] < lastNs:
+            counters["late"] += 1
+        lastNs = item[0]
+        yield item
+
+def mergeCaptures(capturePaths, outputPath, window=MERGE_REORDER_WINDOW):
+    """Merge capture files into a single stream ordered by (mono_ns, source, seq)
+
+    This is a streaming k-way heap merge, so it only holds a few events per
+    input in memory. The monotonic timestamps are only comparable between
+    captures recorded on the same computer (and the same boot). Each output
+    event gets a "source" field with the path of its capture file. Returns
+    the number of merged events and the number of late events.
+    """
+    counters = {"late": 0}
+    windowNs = int(window * 1e9)
+    sources = [_reorderSource(iterCaptureEvents(path), i, windowNs, counters) for i, path in enumerate(capturePaths)]
+    count = 0
+    outputFile = sys.stdout if outputPath == "-" else open(outputPath, "w", encoding="utf-8")
+    try:
+        for _, sourceIndex, _, event in heapq.merge(*sources):
+            event["source"] = capturePaths[sourceIndex]
+            outputFile.write(json.dumps(event) + "\n")
+            count += 1
+    finally:
+        if outputFile is not sys.stdout:
+            outputFile.close()
+    return count, counters["late"]
+
+async def openEndpoint(endpoint):
+    """Connect to a publish endpoint ("unix:PATH" or "tcp:[HOST:]PORT") as a subscriber"""
+    scheme, _, location = endpoint.partition(":")
+    if scheme == "unix":
+        return await asyncio.open_unix_connection(location)
+    if scheme == "tcp":
+        host, _, port = location.rpartition(":")
+        return await asyncio.open_connection(host or "127.0.0.1", int(port))
+    raise ValueError(f"Invalid endpoint '{endpoint}' (expected unix:PATH or tcp:[HOST:]PORT)")
+
+async def mergeLive(endpoints, outputPath, window=MERGE_REORDER_WINDOW):
+    """Subscribe to several publish endpoints (in jsonl format), and write their events as one time-ordered stream
+
+    All the publishers must run on this computer, so that their monotonic
+    timestamps share the same clock: an event is written once it is older
+    than the reorder window, in (mono_ns, source, seq) order. Events that
+    arrive later than that are written right away, and counted as late.
+    Runs until all the publishers have closed their endpoint.
+    """
+    windowNs = int(window * 1e9)
+    pending = []
+    counters = {"events": 0, "late": 0}
+    outputFile = sys.stdout if outputPath == "-" else open(outputPath, "w", encoding="utf-8")
+    lastNs = [0]
+
+    def write(item):
+        monoNs, sourceIndex, _, event = item
+        if monoNs < lastNs[0]:
+            counters["late"] += 1
+        lastNs[0] = max(lastNs[0], monoNs)
+        event["source"] = endpoints[sourceIndex]
+        outputFile.write(json.dumps(event) + "\n")
+        counters["events"] += 1
+
+    async def subscribe(sourceIndex, endpoint):
+        reader, writer = await openEndpoint(endpoint)
+        seq = 0
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            event = json.loads(line)
+            if event.get("kind") == "reply":
+                continue
+            heapq.heappush(pending, (event["mono_ns"], sourceIndex, seq, event))
+            seq += 1
+        writer.close()
+
+    async def release():
+        while True:
+            await asyncio.sleep(0.05)
+            watermark = time.monotonic_ns() - windowNs
+            while pending and pending[0][0] <= watermark:
+                write(heapq.heappop(pending))
+            outputFile.flush()
+
+    releaseTask = asyncio.ensure_future(release())
+    try:
+        await asyncio.gather(*(subscribe(i, endpoint) for i, endpoint in enumerate(endpoints)))
+    finally:
+        releaseTask.cancel()
+        while pending:
+            write(heapq.heappop(pending))
+        if outputFile is sys.stdout:
+            outputFile.flush()
+        else:
+            outputFile.close()
+    return counters["events"], counters["late"]
+
+REGISTRY_BATCH_INTERVAL = 1.0  # Seconds of sightings coalesced into one registry transaction
+REGISTRY_LOOKUP_LIMIT = 500  # Maximum number of known devices returned by a lookup
+REGISTRY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    address TEXT PRIMARY KEY,
+    name TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    sightings INTEGER NOT NULL,
+    rssi_min INTEGER,
+    rssi_max INTEGER,
+    rssi_sum INTEGER NOT NULL DEFAULT 0,
+    rssi_count INTEGER NOT NULL DEFAULT 0,
+    rssi_last INTEGER
+);
+CREATE INDEX IF NOT EXISTS devices_last_seen ON devices (last_seen);
+CREATE TABLE IF NOT EXISTS device_names (
+    address TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (address, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS device_names_name ON device_names (name);
+CREATE TABLE IF NOT EXISTS device_services (
+    address TEXT NOT NULL,
+    uuid TEXT NOT NULL,
+    PRIMARY KEY (address, uuid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS device_services_uuid ON device_services (uuid);
+CREATE TABLE IF NOT EXISTS device_manufacturers (
+    address TEXT NOT NULL,
+    company_id INTEGER NOT NULL,
+    PRIMARY KEY (address, company_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS device_manufacturers_company ON device_manufacturers (company_id);
+"""
+REGISTRY_UPSERT = """
+INSERT INTO devices (address, name, first_seen, last_seen, sightings, rssi_min, rssi_max, rssi_sum, rssi_count, rssi_last)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (address) DO UPDATE SET
+    name = coalesce(excluded.name, name),
+    first_seen = min(first_seen, excluded.first_seen),
+    last_seen = max(last_seen, excluded.last_seen),
+    sightings = sightings + excluded.sightings,
+    rssi_min = min(coalesce(rssi_min, excluded.rssi_min), coalesce(excluded.rssi_min, rssi_min)),
+    rssi_max = max(coalesce(rssi_max, excluded.rssi_max), coalesce(excluded.rssi_max, rssi_max)),
+    rssi_sum = rssi_sum + excluded.rssi_sum,
+    rssi_count = rssi_count + excluded.rssi_count,
+    rssi_last = coalesce(excluded.rssi_last, rssi_last)
+"""
+
+def lookupDevices(path, namePrefix=None, serviceUuid=None, limit=REGISTRY_LOOKUP_LIMIT):
+    """Return the registry devices matching a name prefix and/or an advertised service UUID, most recently seen first"""
+    conditions = []
+    params = []
+    if namePrefix:
+        # Range scan of the name index (case-sensitive, like the scan name filter)
+        conditions.append("address IN (SELECT address FROM device_names WHERE name >= ? AND name < ?)")
+        params += [namePrefix, namePrefix + "\U0010ffff"]
+    if serviceUuid:
+        conditions.append("address IN (SELECT address FROM device_services WHERE uuid = ?)")
+        params.append(normalizeUuid(serviceUuid))
+    query = """
+        SELECT address, name, first_seen, last_seen, sightings, rssi_min, rssi_max, rssi_sum, rssi_count, rssi_last,
+            (SELECT group_concat(name, '\n') FROM device_names n WHERE n.address = d.address),
+            (SELECT group_concat(uuid, '\n') FROM device_services s WHERE s.address = d.address),
+            (SELECT group_concat(company_id, '\n') FROM device_manufacturers m WHERE m.address = d.address)
+        FROM devices d"""
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY last_seen DESC LIMIT ?"
+    params.append(limit)
+    connection = sqlite3.connect(path)
+    try:
+        rows = connection.execute(query, params).fetchall()
+    finally:
+        connection.close()
+    devices = []
+    for row in rows:
+        address, name, firstSeen, lastSeen, sightings, rssiMin, rssiMax, rssiSum, rssiCount, rssiLast, names, services, companies = row
+        devices.append({
+            "address": address,
+            "name": name,
+            "names": sorted(names.split("\n")) if names else [],
+            "services": sorted(services.split("\n")) if services else [],
+            "manufacturers": sorted(int(c) for c in companies.split("\n")) if companies else [],
+            "first_seen": firstSeen,
+            "last_seen": lastSeen,
+            "sightings": sightings,
+            "rssi_min": rssiMin,
+            "rssi_max": rssiMax,
+            "rssi_mean": rssiSum / rssiCount if rssiCount else None,
+            "rssi_last": rssiLast,
+        })
+    return devices
+
+def formatKnownDevice(device):
+    """One-line summary of a registry device"""
+    line = f"{device['name'] or 'Unknown':30s} [{device['address']}]  last seen {datetime.fromtimestamp(device['last_seen']).strftime('%Y-%m-%d %H:%M:%S')}"
+    line += f", first seen {datetime.fromtimestamp(device['first_seen']).strftime('%Y-%m-%d %H:%M:%S')}, {device['sightings']} sighting(s)"
+    if device["rssi_mean"] is not None:
+        line += f", RSSI {device['rssi_min']}/{device['rssi_mean']:.0f}/{device['rssi_max']} dBm (min/mean/max)"
+    if device["services"]:
+        line += f"\n    Services: {', '.join(shortUuid(u) for u in device['services'])}"
+    if device["manufacturers"]:
+        line += f"\n    Manufacturers: {', '.join(f'0x{c:04X}' for c in device['manufacturers'])}"
+    if len(device["names"]) > 1:
+        line += f"\n    Names: {', '.join(device['names'])}"
+    return line
+
+class DeviceRegistry:
+    """Persistent SQLite registry of every device seen by the scans, across sessions
+
+    Sightings are queued by the BLE event loop and written by a background
+    thread, which coalesces them per device and writes each batch in a
+    single transaction, so recording a sighting never blocks on the database.
+    """
+    def __init__(self, path):
+        self.path = path
+        connection = sqlite3.connect(path)
+        try:
+            # WAL lets the GUI look devices up while the writer thread commits
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(REGISTRY_SCHEMA)
+        finally:
+            connection.close()
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._writer, daemon=True)
+        self.thread.start()
+
+    def observe(self, address, name, serviceUuids, companyIds, rssi):
+        """Queue a sighting of a device (called for every advertisement)"""
+        self.queue.put((address.upper(), name, serviceUuids, companyIds, rssi, time.time()))
+
+    def lookup(self, namePrefix=None, serviceUuid=None, limit=REGISTRY_LOOKUP_LIMIT):
+        """Return the known devices matching a name prefix and/or a service UUID"""
+        return lookupDevices(self.path, namePrefix, serviceUuid, limit)
+
+    def flush(self):
+        """Block until all queued sightings have been written"""
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+
+    def close(self):
+        """Write the queued sightings and stop the writer thread"""
+        self.queue.put(None)
+        self.thread.join()
+
+    def _writer(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        while True:
+            item = self.queue.get()
+            batch = {}
+            deadline = time.monotonic() + REGISTRY_BATCH_INTERVAL
+            while True:
+                if item is None or isinstance(item, threading.Event):
+                    break
+                try:
+                    self._coalesce(batch, item)
+                except Exception as e:
+                    print(f"Warning: Invalid device registry sighting {item!r}: {e}")
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    item = False
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = False
+                    break
+            try:
+                if batch:
+                    self._write(connection, batch)
+            except Exception as e:
+                print(f"Warning: Could not update the device registry: {e}")
+            finally:
+                # Waiters are always released, even if the batch couldn't be written
+                if isinstance(item, threading.Event):
+                    item.set()
+            if item is None:
+                connection.close()
+                return
+
+    @staticmethod
+    def _coalesce(batch, sighting):
+        address, name, serviceUuids, companyIds, rssi, seenAt = sighting
+        entry = batch.get(address)
+        if entry is None:
+            # [last name, names, services, companies, first seen, last seen, sightings, RSSI min, max, sum, count, last]
+            entry = batch[address] = [None, set(), set(), set(), seenAt, seenAt, 0, None, None, 0, 0, None]
+        if name:
+            entry[0] = name
+            entry[1].add(name)
+        entry[2].update(serviceUuids)
+        entry[3].update(companyIds)
+        entry[5] = seenAt
+        entry[6] += 1
+        if rssi is not None:
+            entry[7] = rssi if entry[7] is None else min(entry[7], rssi)
+            entry[8] = rssi if entry[8] is None else max(entry[8], rssi)
+            entry[9] += rssi
+            entry[10] += 1
+            entry[11] = rssi
+
+    @staticmethod
+    def _write(connection, batch):
+        with connection:
+            connection.executemany(REGISTRY_UPSERT, [
+                (address, entry[0], *entry[4:]) for address, entry in batch.items()
+            ])
+            connection.executemany(
+                "INSERT OR IGNORE INTO device_names (address, name) VALUES (?, ?)",
+                [(address, name) for address, entry in batch.items() for name in entry[1]]
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO device_services (address, uuid) VALUES (?, ?)",
+                [(address, uuid.lower()) for address, entry in batch.items() for uuid in entry[2]]
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO device_manufacturers (address, company_id) VALUES (?, ?)",
+                [(address, companyId) for address, entry in batch.items() for companyId in entry[3]]
+            )
+
+SEARCH_RESULT_LIMIT = 1000  # Maximum number of events shown by a search
+SEARCH_INDEX_SIZE = 500000  # Default number of most recent events kept by the search index
+SEARCH_CONTEXT_EVENTS = 10  # Events shown before and after the event whose context is shown
+
+def parsePayloadPattern(text):
+    """Compile a payload search pattern: hex bytes with ?? wildcards (e.g. "80 ?? 01"), or "re:" and a bytes regex"""
+    if text.startswith("re:"):
+        return re.compile(text[3:].encode("latin-1"), re.DOTALL)
+    hexText = text.replace(" ", "").replace("0x", "")
+    if len(hexText) % 2:
+        raise ValueError("Hex pattern must have an even number of characters")
+    parts = [hexText[i:i + 2] for i in range(0, len(hexText), 2)]
+    return re.compile(b"".join(b"." if part == "??" else re.escape(bytes.fromhex(part)) for part in parts), re.DOTALL)
+
+class EventIndex:
+    """In-memory index of the session events, for searching the session history
+
+    Events are added (by the BLE event loop) in arrival order, and numbered
+    consecutively. The postings of every (kind, device, characteristic)
+    combination hold the numbers of its events and their timestamps, both in
+    increasing order, so that a search only visits the combinations matching
+    its fields, and finds its time range by bisection. Searches can run from
+    another thread: they only consider the events added before they started.
+
+    Only the last capacity events are kept in memory (the whole session is in
+    the capture file): once the index holds an eighth more, the oldest events
+    are dropped, along with their postings. A capacity of 0 disables it.
+    """
+    def __init__(self, capacity=SEARCH_INDEX_SIZE):
+        self.capacity = capacity
+        self.events = []  # Events firstId to nextId - 1
+        self.firstId = 0
+        self.nextId = 0
+        self.sessionStartNs = None
+        self.postings = {}  # (kind, device, char) -> (event numbers, timestamps)
+        self.lock = threading.Lock()  # Held while pruning, and by searches and lookups
+
+    def __len__(self):
+        return len(self.events)
+
+    def add(self, event):
+        if not self.capacity:
+            return
+        monoNs, _, kind, device, char = event[:5]
+        if self.sessionStartNs is None:
+            self.sessionStartNs = monoNs
+        key = (kind, device, char)
+        posting = self.postings.get(key)
+        if posting is None:
+            posting = self.postings[key] = (array('q'), array('q'))
+        ids, times = posting
+        # The timestamps of a posting are kept non-decreasing, for bisection
+        times.append(max(monoNs, times[-1]) if times else monoNs)
+        ids.append(self.nextId)
+        self.events.append(event)
+        self.nextId += 1
+        if len(self.events) > self.capacity + self.capacity // 8:
+            self._prune()
+
+    def _prune(self):
+        """Drop the oldest events, down to the capacity of the index"""
+        with self.lock:
+            drop = len(self.events) - self.capacity
+            del self.events[:drop]
+            self.firstId += drop
+            for key, (ids, times) in list(self.postings.items()):
+                kept = bisect.bisect_left(ids, self.firstId)
+                if kept == len(ids):
+                    del self.postings[key]
+                elif kept:
+                    del ids[:kept]
+                    del times[:kept]
+
+    def get(self, eventId):
+        """Return an event by number, or None if it was dropped from the index"""
+        with self.lock:
+            index = eventId - self.firstId
+            return self.events[index] if 0 <= index < len(self.events) else None
+
+    def startNs(self):
+        """Return the timestamp of the first event of the session (or None)"""
+        return self.sessionStartNs
+
+    def search(self, kind=None, device=None, char=None, start=None, end=None, payload=None, limit=SEARCH_RESULT_LIMIT):
+        """Return the numbers of the first matching events (up to limit), and the number of matches
+
+        start and end are monotonic timestamps in nanoseconds, and payload a
+        compiled bytes regex. The number of matches is None when it is only
+        known to be larger than limit (payload searches stop at limit).
+        """
+        with self.lock:
+            return self._search(kind, device, char, start, end, payload, limit)
+
+    def _search(self, kind, device, char, start, end, payload, limit):
+        eventCount = self.nextId
+        device = device.upper() if device else None
+        if char:
+            # A UUID matches all the characteristics with that UUID, and UUID#N only one of them
+            uuid, separator, instance = char.partition("#")
+            char = normalizeUuid(uuid) + separator + instance
+        ranges = []
+        for (postingKind, postingDevice, postingChar), (ids, times) in list(self.postings.items()):
+            if kind and postingKind != kind:
+                continue
+            if device and (postingDevice or "").upper() != device:
+                continue
+            if char and postingChar != char and ("#" in char or (postingChar or "").partition("#")[0] != char):
+                continue
+            lo = bisect.bisect_left(times, start) if start is not None else 0
+            hi = min(bisect.bisect_right(times, end) if end is not None else len(times), len(ids))
+            # Leave out the events added since the search started
+            hi = bisect.bisect_left(ids, eventCount, lo, hi) if lo < hi else hi
+            if lo < hi:
+                ranges.append((ids, lo, hi))
+
+        if payload is None:
+            total = sum(hi - lo for _, lo, hi in ranges)
+            merged = heapq.merge(*(ids[lo:hi] for ids, lo, hi in ranges))
+            return list(itertools.islice(merged, limit)), total
+        matches = []
+        for eventId in heapq.merge(*(ids[lo:hi] for ids, lo, hi in ranges)):
+            if payload.search(self.events[eventId - self.firstId][5]):
+                matches.append(eventId)
+                if len(matches) > limit:
+                    return matches[:limit], None
+        return matches, len(matches)
+
+PLOT_SAMPLES = 65536  # Raw samples kept per plotted field
+PLOT_FRAME_INTERVAL_MS = 100  # Minimum time between chart redraws
+PLOT_COLORS = ("#1f77b4", "#d62728", "#2ca02c", "#ff7f0e", "#9467bd", "#8c564b")
+
+class PlotSeries:
+    """Time series of a decoded field, decimated to min/max per chart pixel column
+
+    The raw samples are held in fixed-size ring buffers. Each sample also
+    updates the min/max of its time bucket (one bucket per pixel column of the
+    chart), so a redraw only walks the buckets: O(chart width) regardless of
+    the number of samples. The buckets are only rebuilt from the raw samples
+    when the chart width or the time window change.
+
+    Samples are appended by the BLE event loop thread and read by the Tk thread;
+    a redraw racing with an append can at worst show one stale bucket.
+    """
+    def __init__(self, capacity=PLOT_SAMPLES):
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.count = 0
+        self.last = None
+        self.setResolution(1.0, 1)
+
+    def setResolution(self, bucketSpan, bucketCount):
+        """Set the bucket duration (seconds) and count, and rebuild the buckets from the raw samples"""
+        # The bucket state is swapped in as a single tuple, so that a concurrent
+        # append never sees a mix of old and new bucket arrays
+        buckets = (bucketSpan, bucketCount, array('q', [-1]) * bucketCount,
+                   array('d', bytes(8 * bucketCount)), array('d', bytes(8 * bucketCount)))
+        for i in range(max(0, self.count - self.capacity), self.count):
+            self._addToBucket(buckets, self.times[i % self.capacity], self.values[i % self.capacity])
+        self.buckets = buckets
+        self.bucketSpan = bucketSpan
+        self.bucketCount = bucketCount
+
+    def append(self, t, value):
+        """Add a sample (t in seconds on the monotonic clock)"""
+        i = self.count % self.capacity
+        self.times[i] = t
+        self.values[i] = value
+        self.count += 1
+        self.last = value
+        self._addToBucket(self.buckets, t, value)
+
+    @staticmethod
+    def _addToBucket(buckets, t, value):
+        bucketSpan, bucketCount, bucketIds, bucketMins, bucketMaxs = buckets
+        bucketId = int(t / bucketSpan)
+        pos = bucketId % bucketCount
+        if bucketIds[pos] != bucketId:
+            bucketIds[pos] = bucketId
+            bucketMins[pos] = value
+            bucketMaxs[pos] = value
+        elif value < bucketMins[pos]:
+            bucketMins[pos] = value
+        elif value > bucketMaxs[pos]:
+            bucketMaxs[pos] = value
+
+    def columns(self, now):
+        """Return (column, min, max) for each bucket with samples, for the buckets of the window ending at now"""
+        bucketSpan, bucketCount, bucketIds, bucketMins, bucketMaxs = self.buckets
+        lastId = int(now / bucketSpan)
+        firstId = lastId - bucketCount + 1
+        result = []
+        for bucketId in range(firstId, lastId + 1):
+            pos = bucketId % bucketCount
+            if bucketIds[pos] == bucketId:
+                result.append((bucketId - firstId, bucketMins[pos], bucketMaxs[pos]))
+        return result
+
+def normalizeUuid(uuid):
+    """Normalize UUID to full 128-bit format with lowercase"""
+    # Remove spaces and dashes
+    uuidClean = uuid.replace("-", "").replace(" ", "").lower()
+    
+    # Check length
+    if len(uuidClean) == 4:
+        # 16-bit UUID - convert to 128-bit
+        return f"0000{uuidClean}-0000-1000-8000-00805f9b34fb"
+    elif len(uuidClean) == 32:
+        # 128-bit UUID - format with dashes
+        return f"{uuidClean[0:8]}-{uuidClean[8:12]}-{uuidClean[12:16]}-{uuidClean[16:20]}-{uuidClean[20:32]}"
+    else:
+        # Return as-is and let it fail with proper error message
+        return uuid.lower()
+
+class CharacteristicIndex:
+    """Characteristics of the connected device, keyed by ATT handle
+
+    A device can expose the same characteristic UUID several times (in
+    different services, or as several instances in one service), so the
+    characteristics are indexed by handle, with a UUID -> handles multimap.
+    A characteristic is addressed by "UUID" (when it is unique), "UUID#N"
+    (its Nth instance, in handle order) or "@HANDLE".
+    """
+    def __init__(self):
+        self.byHandle = {}
+        self.byUuid = {}
+
+    def build(self, services):
+        """Index the characteristics of the discovered services"""
+        byHandle = {}
+        byUuid = {}
+        for service in services:
+            for char in service.characteristics:
+                byHandle[char.handle] = char
+        for handle in sorted(byHandle):
+            byUuid.setdefault(byHandle[handle].uuid, []).append(handle)
+        self.byHandle, self.byUuid = byHandle, byUuid
+
+    def clear(self):
+        self.byHandle, self.byUuid = {}, {}
+
+    def withProperties(self, properties):
+        """Return the characteristics having any of the given properties"""
+        return [char for char in self.byHandle.values() if any(p in char.properties for p in properties)]
+
+    def resolve(self, spec, properties=None):
+        """Return the characteristic addressed by a "UUID", "UUID#N" or "@HANDLE" spec
+
+        Raises ValueError if it isn't found, is ambiguous, or has none of the given properties.
+        """
+        spec = spec.strip()
+        if spec.startswith("@"):
+            try:
+                char = self.byHandle.get(int(spec[1:], 0))
+            except ValueError:
+                raise ValueError(f"Invalid handle: {spec}") from None
+        else:
+            uuid, _, instance = spec.partition("#")
+            handles = self.byUuid.get(normalizeUuid(uuid), [])
+            if instance:
+                try:
+                    position = int(instance) - 1
+                except ValueError:
+                    raise ValueError(f"Invalid instance number: {spec}") from None
+                char = self.byHandle[handles[position]] if 0 <= position < len(handles) else None
+            elif len(handles) > 1:
+                raise ValueError(f"Characteristic {uuid} has {len(handles)} instances: "
+                                 f"use {uuid}#1 to {uuid}#{len(handles)}, or @HANDLE")
+            else:
+                char = self.byHandle[handles[0]] if handles else None
+        if char is None:
+            raise ValueError(f"Characteristic {spec} not found")
+        if properties and not any(p in char.properties for p in properties):
+            raise ValueError(f"Characteristic {spec} has no {' or '.join(properties)} property")
+        return char
+
+    def label(self, char, short=False):
+        """Return the spec addressing a characteristic: its UUID, followed by #N if it isn't unique"""
+        uuid = shortUuid(char.uuid) if short else char.uuid
+        handles = self.byUuid.get(char.uuid, [])
+        if len(handles) > 1 and char.handle in handles:
+            return f"{uuid}#{handles.index(char.handle) + 1}"
+        return uuid
+
+# Device Information Service characteristics included in the sweep records
+DEVICE_INFORMATION_FIELDS = {
+    sigUuid(0x2a29): "manufacturer_name",
+    sigUuid(0x2a24): "model_number",
+    sigUuid(0x2a25): "serial_number",
+    sigUuid(0x2a27): "hardware_revision",
+    sigUuid(0x2a26): "firmware_revision",
+    sigUuid(0x2a28): "software_revision",
+    sigUuid(0x2a23): "system_id",
+}
+SWEEP_RETRY_DELAY = 1.0  # Delay before the first retry of a device, doubled on every retry
+
+async def exploreService(service, readFunc=None, onValue=None, onRecord=None):
+    """Inventory the characteristics of a service, reading the readable ones
+
+    readFunc(char) is the coroutine function reading a value (None to skip the
+    reads), and onValue(char, value, fields, monoNs) is called for every value
+    read, with the monotonic time at which the read completed. onRecord(char,
+    record) is called as soon as each characteristic has been inventoried.
+    Returns a JSON-serializable record of the service.
+    """
+    chars = []
+    for char in sorted(service.characteristics, key=lambda c: c.uuid):
+        record = {
+            "uuid": char.uuid,
+            "handle": char.handle,
+            "description": char.description,
+            "properties": list(char.properties),
+            "descriptors": [{"uuid": desc.uuid, "handle": desc.handle} for desc in char.descriptors],
+        }
+        if readFunc and "read" in char.properties:
+            try:
+                value = await readFunc(char)
+                monoNs = time.monotonic_ns()
+                decoder = characteristicDecoders.get(char.uuid)
+                fields = decodeCharacteristic(decoder, value) if decoder else None
+                record["value"] = value.hex()
+                strValue = value.decode('utf-8', errors='ignore')
+                if strValue and strValue.isprintable():
+                    record["string"] = strValue
+                if fields:
+                    record["decoded"] = fields
+                if onValue:
+                    onValue(char, value, fields, monoNs)
+            except asyncio.TimeoutError:
+                record["error"] = "timeout"
+            except Exception as e:
+                record["error"] = str(e)
+        chars.append(record)
+        if onRecord:
+            onRecord(char, record)
+    return {
+        "uuid": service.uuid,
+        "handle": service.handle,
+        "description": service.description,
+        "characteristics": chars,
+    }
+
+def deviceInformation(inventory):
+    """Collect the Device Information values of a GATT inventory"""
+    info = {}
+    for service in inventory:
+        for char in service["characteristics"]:
+            field = DEVICE_INFORMATION_FIELDS.get(char["uuid"])
+            if field and "value" in char:
+                # The System ID is binary, the other values are strings
+                info[field] = char["value"] if field == "system_id" else char.get("string", char["value"])
+    return info
+
+class AdapterPool:
+    """Bluetooth adapters used to scan and connect, with the devices each one saw and its connections
+
+    A connection is placed on the least-loaded adapter among those that saw
+    the device (the strongest RSSI breaks ties), and uses the BLEDevice
+    discovered by that adapter, so the backend connects through it.
+
+    The scanners and clients are created by scannerFactory and clientFactory
+    (BleakScanner and BleakClient by default), which can be replaced by
+    stand-ins of the backend to run without adapters.
+    """
+    def __init__(self, adapters, scannerFactory=None, clientFactory=None):
+        self.scannerFactory = scannerFactory or BleakScanner
+        self.clientFactory = clientFactory or BleakClient
+        self.adapters = list(adapters)
+        self.available = list(self.adapters)  # Adapters that could be started by the last scan
+        self.connections = {adapter: 0 for adapter in self.adapters}
+        self.sightings = {}  # Upper case address -> {adapter: [BLEDevice, last RSSI, advertisement count]}
+
+    def observe(self, adapter, device, rssi):
+        """Record an advertisement received by an adapter (called from the detection callbacks)"""
+        seen = self.sightings.setdefault(device.address.upper(), {})
+        sighting = seen.get(adapter)
+        if sighting is None:
+            seen[adapter] = [device, rssi, 1]
+        else:
+            sighting[1] = rssi
+            sighting[2] += 1
+
+    def clearSightings(self):
+        """Forget the devices seen by the previous scans"""
+        self.sightings = {}
+
+    def seenBy(self, address):
+        """Return the (adapter, last RSSI, advertisement count) of each adapter that saw a device, strongest first"""
+        seen = list(self.sightings.get(address.upper(), {}).items())
+        return sorted(
+            ((adapter, rssi, count) for adapter, (device, rssi, count) in seen),
+            key=lambda s: -s[1] if s[1] is not None else 999
+        )
+
+    def acquire(self, address):
+        """Choose the adapter of a new connection to a device, and count the connection on it
+
+        Returns the adapter and the BLEDevice it discovered (None if it didn't
+        see the device, in which case the caller connects with the BLEDevice
+        it already has, if any, or has the backend discover the device again).
+        """
+        seen = self.sightings.get(address.upper(), {})
+        candidates = [adapter for adapter in self.available if adapter in seen] or self.available
+        def load(adapter):
+            rssi = seen[adapter][1] if adapter in seen else None
+            return (self.connections[adapter], -rssi if rssi is not None else 999)
+        adapter = min(candidates, key=load)
+        self.connections[adapter] += 1
+        return adapter, seen[adapter][0] if adapter in seen else None
+
+    def release(self, adapter):
+        """Count a connection placed by acquire() as closed"""
+        self.connections[adapter] -= 1
+
+    def loadSummary(self):
+        """Number of connections placed on each adapter"""
+        return ", ".join(f"{adapter}: {count}" for adapter, count in self.connections.items())
+
+async def startScanners(detectionCallback, adapterPool=None, **kwargs):
+    """Start a BleakScanner on each adapter of the pool (or one on the default adapter), on the running event loop
+
+    The advertisements of all the scanners go to the same detection callback,
+    after being recorded by the pool. Returns the started scanners, and the
+    errors of the adapters that couldn't be started.
+    """
+    if not adapterPool:
+        scanner = BleakScanner(detection_callback=detectionCallback, **kwargs)
+        await scanner.start()
+        return [scanner], []
+    scanners = []
+    started = []
+    errors = []
+    for adapter in adapterPool.adapters:
+        def adapterCallback(device, advertisement_data, adapter=adapter):
+            adapterPool.observe(adapter, device, advertisement_data.rssi)
+            detectionCallback(device, advertisement_data)
+        try:
+            scanner = adapterPool.scannerFactory(detection_callback=adapterCallback, adapter=adapter, **kwargs)
+            await scanner.start()
+        except Exception as e:
+            errors.append(f"{adapter}: {str(e) or type(e).__name__}")
+            continue
+        scanners.append(scanner)
+        started.append(adapter)
+    if not scanners:
+        raise RuntimeError("No adapter could be started (" + "; ".join(errors) + ")")
+    # Connections are only placed on the adapters that work
+    adapterPool.available = started
+    return scanners, errors
+
+async def stopScanners(scanners):
+    """Stop the scanners started by startScanners()"""
+    await asyncio.gather(*(scanner.stop() for scanner in scanners), return_exceptions=True)
+
+async def scanMatchingDevices(serviceUuid, namePrefix, duration, adapterPool=None):
+    """Scan (headless) for the devices matching the advertised service UUID and/or name prefix"""
+    fullUuid = normalizeUuid(serviceUuid) if serviceUuid else None
+    found = {}
+
+    def detectionCallback(device, advertisement_data):
+        if device.address in found:
+            return
+        if fullUuid and fullUuid not in [u.lower() for u in advertisement_data.service_uuids or []]:
+            return
+        if namePrefix and not (device.name or "").startswith(namePrefix):
+            return
+        found[device.address] = device
+
+    scanners, errors = await startScanners(detectionCallback, adapterPool)
+    for error in errors:
+        print(f"Could not scan on adapter {error}")
+    await asyncio.sleep(duration)
+    await stopScanners(scanners)
+    return list(found.values())
+
+async def sweepDevice(target, opTimeout, retries, scanTimeout, adapterPool=None):
+    """Connect to a device (a BLEDevice, or an address), inventory its GATT table, and disconnect
+
+    Failed attempts are retried with exponential backoff. Returns the JSON
+    record of the device, with the timing of each step of the last attempt.
+    With an adapter pool, each attempt is placed on the least-loaded adapter.
+    """
+    address = target if isinstance(target, str) else target.address
+    record = {"address": address}
+    sweepStart = time.monotonic()
+    for attempt in range(1, retries + 2):
+        record["attempts"] = attempt
+        record.pop("error", None)
+        timings = {}
+        start = time.monotonic()
+        client = None
+        adapter = None
+        try:
+            device = target
+            adapterArgs = {}
+            if adapterPool:
+                adapter, adapterDevice = adapterPool.acquire(address)
+                device = adapterDevice or target
+                adapterArgs["adapter"] = adapter
+                record["adapter"] = adapter
+            if isinstance(device, str):
+                scannerFactory = adapterPool.scannerFactory if adapterPool else BleakScanner
+                device = await scannerFactory.find_device_by_address(address, timeout=scanTimeout, **adapterArgs)
+                if device is None:
+                    raise RuntimeError("device not found")
+                timings["resolve_s"] = round(time.monotonic() - start, 3)
+            record["name"] = device.name
+            clientFactory = adapterPool.clientFactory if adapterPool else BleakClient
+            client = clientFactory(device, timeout=opTimeout, **adapterArgs)
+            await client.connect()
+            timings["connect_s"] = round(time.monotonic() - start, 3)
+            readFunc = lambda char: asyncio.wait_for(client.read_gatt_char(char), opTimeout)
+            inventory = []
+            for service in sorted(client.services, key=lambda s: s.uuid):
+                inventory.append(await exploreService(service, readFunc))
+            timings["explore_s"] = round(time.monotonic() - start, 3)
+            record["mtu"] = client.mtu_size
+            record["device_information"] = deviceInformation(inventory)
+            record["services"] = inventory
+        except Exception as e:
+            record["error"] = str(e) or type(e).__name__
+        finally:
+            if client:
+                try:
+                    await client.disconnect()
+                except Exception:
+                    pass
+            if adapter:
+                adapterPool.release(adapter)
+        timings["total_s"] = round(time.monotonic() - start, 3)
+        record["timings"] = timings
+        if "error" not in record:
+            break
+        if attempt <= retries:
+            await asyncio.sleep(SWEEP_RETRY_DELAY * 2 ** (attempt - 1))
+    record["ok"] = "error" not in record
+    record["elapsed_s"] = round(time.monotonic() - sweepStart, 3)
+    return record
+
+async def runSweep(targets, outputPath, concurrency=4, retries=2, opTimeout=10.0, scanTimeout=5.0, adapterPool=None):
+    """Sweep the GATT tables of many devices with a pool of concurrent workers
+
+    Writes one JSON record per device to outputPath (JSON lines, in completion
+    order), and returns the number of devices swept successfully.
+    """
+    pending = deque(targets)
+    swept = [0, 0]  # Succeeded, failed
+    start = time.monotonic()
+
+    with open(outputPath, "w", encoding="utf-8") as outputFile:
+        async def worker():
+            while pending:
+                target = pending.popleft()
+                try:
+                    record = await sweepDevice(target, opTimeout, retries, scanTimeout, adapterPool)
+                except Exception as e:
+                    # Don't let one device stop the worker, and the devices still pending with it
+                    address = target if isinstance(target, str) else target.address
+                    record = {"address": address, "attempts": 0, "ok": False,
+                              "error": str(e) or type(e).__name__, "elapsed_s": 0.0}
+                outputFile.write(json.dumps(record) + "\n")
+                outputFile.flush()
+                swept[0 if record["ok"] else 1] += 1
+                status = f"{record['elapsed_s']:.1f} s" if record["ok"] else f"FAILED: {record['error']}"
+                adapter = f" on {record['adapter']}" if "adapter" in record else ""
+                print(f"[{sum(swept)}/{len(targets)}] {record['address']}{adapter} "
+                      f"({record['attempts']} attempt(s)): {status}")
+
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(targets))))))
+
+    elapsed = time.monotonic() - start
+    rate = len(targets) / elapsed * 60 if elapsed > 0 else 0.0
+    print(f"Swept {len(targets)} device(s) in {elapsed:.1f} s ({rate:.1f} devices/minute): "
+          f"{swept[0]} succeeded, {swept[1]} failed")
+    return swept[0]
+
+THROUGHPUT_REORDER_WINDOW = 4096  # Most recent missing counters a late packet can still fill
+
+class ThroughputStats:
+    """Packet, byte, payload size and sequence-gap counters of one direction of a throughput test
+
+    seqSpec ("FORMAT[@OFFSET]", e.g. "<H" or ">I@2") describes a counter
+    carried by every payload, as a struct format and a byte offset; gaps in
+    the counter are counted as lost packets (it may wrap around). A late
+    packet filling one of the last THROUGHPUT_REORDER_WINDOW missing counters
+    is no longer counted as lost, only as out of order.
+    """
+    def __init__(self, seqSpec=None):
+        self.packets = 0
+        self.bytes = 0
+        self.sizes = {}
+        self.start = None
+        self.first = None
+        self.end = None
+        self.seq = None
+        if seqSpec:
+            fmt, _, offset = seqSpec.partition("@")
+            self.seq = struct.Struct(fmt)
+            self.seqOffset = int(offset or 0)
+            self.seqWrap = 1 << (8 * self.seq.size)
+            self.expected = None
+            self.missing = {}  # Missing counters, oldest first (a dict, as an ordered set)
+            self.reorderWindow = min(THROUGHPUT_REORDER_WINDOW, self.seqWrap // 2)
+            self.lost = 0
+            self.outOfOrder = 0
+            self.duplicates = 0
+
+    def add(self, data, monoNs):
+        self.packets += 1
+        self.bytes += len(data)
+        self.sizes[len(data)] = self.sizes.get(len(data), 0) + 1
+        if self.first is None:
+            self.first = monoNs
+        self.end = monoNs
+        if self.seq is None:
+            return
+        try:
+            counter = self.seq.unpack_from(data, self.seqOffset)[0]
+        except struct.error:
+            return
+        if self.expected is not None:
+            gap = (counter - self.expected) % self.seqWrap
+            if gap >= self.seqWrap // 2:
+                # Behind the expected counter: a late or duplicated packet
+                self.outOfOrder += 1
+                if counter in self.missing:
+                    del self.missing[counter]
+                    self.lost -= 1
+                else:
+                    self.duplicates += 1
+                return
+            self.lost += gap
+            for i in range(max(0, gap - self.reorderWindow), gap):
+                self.missing[(self.expected + i) % self.seqWrap] = None
+            # Forget the counters missing since before the last wrap around
+            self.missing.pop(counter, None)
+            while len(self.missing) > self.reorderWindow:
+                del self.missing[next(iter(self.missing))]
+        self.expected = (counter + 1) % self.seqWrap
+
+    def result(self):
+        """Return the JSON-serializable results, over the time from the start of the test to the last packet"""
+        duration = (self.end - self.start) / 1e9 if self.packets and self.end > self.start else 0.0
+        result = {
+            "packets": self.packets,
+            "bytes": self.bytes,
+            "duration_s": round(duration, 3),
+            "goodput_bytes_per_s": round(self.bytes / duration, 1) if duration else 0.0,
+            "packets_per_s": round(self.packets / duration, 1) if duration else 0.0,
+            "payload_sizes": {str(size): count for size, count in sorted(self.sizes.items())},
+        }
+        if self.first is not None:
+            result["first_packet_s"] = round((self.first - self.start) / 1e9, 3)
+        if self.packets:
+            result["payload_min"] = min(self.sizes)
+            result["payload_max"] = max(self.sizes)
+            result["payload_mean"] = round(self.bytes / self.packets, 1)
+        if self.seq is not None:
+            expected = self.packets - self.duplicates + self.lost
+            result["lost"] = self.lost
+            result["out_of_order"] = self.outOfOrder
+            result["loss_pct"] = round(100.0 * self.lost / expected, 3) if expected else 0.0
+        return result
+
+def formatThroughputResult(label, result):
+    """Format one direction of a throughput test result for the console"""
+    text = (f"{label}: {result['bytes']} bytes in {result['packets']} packets over {result['duration_s']:.2f} s, "
+            f"goodput {result['goodput_bytes_per_s']:.0f} bytes/s, {result['packets_per_s']:.1f} packets/s")
+    if "first_packet_s" in result:
+        text += f"\n  first packet after {result['first_packet_s'] * 1000:.0f} ms"
+    if result["packets"]:
+        text += (f"\n  payload sizes: min {result['payload_min']}, mean {result['payload_mean']}, "
+                 f"max {result['payload_max']} bytes ({len(result['payload_sizes'])} distinct)")
+    if "lost" in result:
+        text += f"\n  sequence gaps: {result['lost']} lost ({result['loss_pct']:.3f} %), {result['out_of_order']} out of order"
+    return text
+
+async def runThroughputTest(args):
+    """Run a notification and/or write-without-response throughput test, and return the results
+
+    The test runs for --throughput-duration seconds, or until --throughput-bytes
+    have been received (or sent) in each direction, whichever comes first.
+    """
+    if args.throughput_notify is None and args.throughput_write is None:
+        raise ValueError("--throughput requires --throughput-notify and/or --throughput-write")
+    device = await BleakScanner.find_device_by_address(args.throughput, timeout=float(args.scan_duration))
+    if device is None:
+        raise RuntimeError(f"Device {args.throughput} not found")
+    client = BleakClient(device, timeout=args.op_timeout)
+    await client.connect()
+    try:
+        characteristics = CharacteristicIndex()
+        characteristics.build(client.services)
+        byteLimit = args.throughput_bytes
+        deadline = time.monotonic() + args.throughput_duration
+        results = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "address": device.address,
+            "name": device.name,
+            "platform": sys.platform,
+            "mtu": client.mtu_size,
+            "duration_limit_s": args.throughput_duration,
+            "byte_limit": byteLimit,
+        }
+        tasks = []
+
+        if args.throughput_notify is not None:
+            notifyChar = characteristics.resolve(args.throughput_notify, ("notify", "indicate"))
+            notifyStats = ThroughputStats(args.throughput_seq)
+            notifyDone = asyncio.Event()
+
+            def notificationHandler(sender, data):
+                monoNs = time.monotonic_ns()
+                notifyStats.add(data, monoNs)
+                if byteLimit and notifyStats.bytes >= byteLimit:
+                    notifyDone.set()
+
+            async def receive():
+                # The test starts with the subscription request, as notifications can arrive before it completes
+                notifyStats.start = notifyStats.end = time.monotonic_ns()
+                await client.start_notify(notifyChar, notificationHandler)
+                try:
+                    await asyncio.wait_for(notifyDone.wait(), max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    pass
+                await client.stop_notify(notifyChar)
+                results["notify"] = dict(char=characteristics.label(notifyChar), **notifyStats.result())
+
+            tasks.append(receive())
+
+        if args.throughput_write is not None:
+            writeChar = characteristics.resolve(args.throughput_write, ("write-without-response",))
+            payloadSize = args.throughput_payload or getattr(writeChar, "max_write_without_response_size", 20)
+            writeStats = ThroughputStats()
+
+            async def send():
+                # Every payload starts with a little-endian packet counter, so that the device can count the gaps
+                counterSize = min(4, payloadSize)
+                padding = bytes(payloadSize - counterSize)
+                writeStats.start = writeStats.end = time.monotonic_ns()
+                while time.monotonic() < deadline and not (byteLimit and writeStats.bytes >= byteLimit):
+                    counter = (writeStats.packets % (1 << (8 * counterSize))).to_bytes(counterSize, "little")
+                    payload = counter + padding
+                    await client.write_gatt_char(writeChar, payload, response=False)
+                    writeStats.add(payload, time.monotonic_ns())
+                results["write"] = dict(char=characteristics.label(writeChar), **writeStats.result())
+
+            tasks.append(send())
+
+        await asyncio.gather(*tasks)
+        return results
+    finally:
+        await client.disconnect()
+
+async def throughputTest(args):
+    """Run the --throughput test, print (and save) its results, and return the exit code"""
+    try:
+        results = await runThroughputTest(args)
+    except Exception as e:
+        print(f"Throughput test failed: {e}")
+        return 1
+    print(f"Throughput test of {results['name'] or 'Unknown'} ({results['address']}), MTU {results['mtu']}")
+    if "notify" in results:
+        print(formatThroughputResult(f"Notifications ({results['notify']['char']})", results["notify"]))
+    if "write" in results:
+        print(formatThroughputResult(f"Writes without response ({results['write']['char']})", results["write"]))
+    if args.throughput_output:
+        # One JSON line per run, so that the results of several runs can be compared
+        with open(args.throughput_output, "a", encoding="utf-8") as outputFile:
+            outputFile.write(json.dumps(results) + "\n")
+        print(f"Results appended to {args.throughput_output}")
+    return 0
+
+POLL_COALESCE_WINDOW = 0.002  # Polls due within this many seconds of each other run together
+
+class PollState:
+    """Scheduling state and statistics of a polled characteristic"""
+    def __init__(self, handle, label, interval, now):
+        self.handle = handle
+        self.label = label
+        self.interval = interval
+        self.deadline = now
+        self.outstanding = False
+        self.started = now
+        self.reads = 0
+        self.errors = 0
+        self.skipped = 0
+        self.totalLatency = 0.0
+
+    def stats(self):
+        """Describe the requested vs achieved poll rate"""
+        elapsed = time.monotonic() - self.started
+        achieved = self.reads / elapsed if elapsed > 0 else 0.0
+        latency = f", mean latency {self.totalLatency / self.reads * 1000:.0f} ms" if self.reads else ""
+        return (f"requested {1 / self.interval:.2f} Hz, achieved {achieved:.2f} Hz "
+                f"({self.reads} reads, {self.skipped} skipped, {self.errors} errors{latency})")
+
+class ReadPoller:
+    """Deadline-based scheduler polling readable characteristics, run on the BLE event loop
+
+    Each characteristic has its own interval. Polls that fall due at the same
+    time are started together, there is never more than one outstanding read
+    per characteristic, and a poll that falls due while the previous read is
+    still in flight is skipped (and counted) rather than queued.
+    """
+    def __init__(self, readFunc):
+        self.readFunc = readFunc  # Coroutine function reading (and handling) one characteristic, by handle
+        self.polls = {}
+        self.heap = []
+        self.wakeup = asyncio.Event()
+
+    def add(self, handle, label, interval):
+        """Start polling a characteristic (replaces its interval if already polled)"""
+        poll = PollState(handle, label, interval, time.monotonic())
+        self.polls[handle] = poll
+        heapq.heappush(self.heap, (poll.deadline, id(poll), poll))
+        self.wakeup.set()
+
+    def remove(self, handle):
+        """Stop polling a characteristic, returning its PollState (or None)"""
+        return self.polls.pop(handle, None)
+
+    def stats(self):
+        """Return one statistics line per polled characteristic"""
+        return [f"{poll.label}: {poll.stats()}" for poll in self.polls.values()]
+
+    async def run(self):
+        while True:
+            # Wait for the earliest deadline (or for the schedule to change)
+            if self.heap:
+                delay = self.heap[0][0] - time.monotonic()
+            else:
+                delay = None
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+                continue
+
+            # Start every poll that is due
+            now = time.monotonic()
+            while self.heap and self.heap[0][0] <= now + POLL_COALESCE_WINDOW:
+                _, _, poll = heapq.heappop(self.heap)
+                if self.polls.get(poll.handle) is not poll:
+                    # Removed or replaced
+                    continue
+                if poll.outstanding:
+                    poll.skipped += 1
+                else:
+                    poll.outstanding = True
+                    asyncio.ensure_future(self._read(poll))
+                # Keep the cadence, but never try to catch up on missed polls
+                poll.deadline += poll.interval
+                if poll.deadline <= now:
+                    missed = int((now - poll.deadline) / poll.interval) + 1
+                    poll.skipped += missed
+                    poll.deadline += missed * poll.interval
+                heapq.heappush(self.heap, (poll.deadline, id(poll), poll))
+
+    async def _read(self, poll):
+        start = time.monotonic()
+        try:
+            await self.readFunc(poll.handle)
+            poll.reads += 1
+            poll.totalLatency += time.monotonic() - start
+        except Exception:
+            poll.errors += 1
+        finally:
+            poll.outstanding = False
+
+def formatTreeValue(value, fields=None):
+    """Format a characteristic or descriptor value for the GATT tree"""
+    text = value.hex(" ") if value else "(empty)"
+    if fields:
+        text += f"  ({formatDecodedFields(fields)})"
+    else:
+        try:
+            strValue = value.decode('utf-8')
+            if strValue and strValue.isprintable():
+                text += f'  "{strValue}"'
+        except UnicodeDecodeError:
+            pass
+    return text
+
+# Display modes of the notifications in the output log (label: mode)
+NOTIFY_DISPLAY_MODES = {
+    "Every packet": "all",
+    "At most N per second": "rate",
+    "Latest value only": "latest",
+    "Changes only": "changes",
+}
+NOTIFY_TABLE_INTERVAL_MS = 250  # Refresh interval of the subscriptions table
+
+class NotificationSubscription:
+    """An active notification subscription: its characteristic, display mode and counters
+
+    update() is called by the notification handler for every packet, and
+    decides whether the packet is shown in the output log; the counters and
+    latest value are shown in the subscriptions table whatever the mode.
+    """
+    def __init__(self, char, label, displayMode="all", maxRate=2.0):
+        self.char = char
+        self.label = label
+        self.decoder = characteristicDecoders.get(char.uuid)
+        self.displayMode = displayMode
+        self.minInterval = int(1e9 / maxRate)  # Nanoseconds
+        self.received = 0
+        self.receivedBytes = 0
+        self.shown = 0
+        self.lastData = None
+        self.lastFields = None
+        self.nextShowNs = 0
+        self.tableSnapshot = (time.monotonic(), 0)  # Time and received count of the last table refresh
+        self.requestNs = time.monotonic_ns()  # Time of the subscription request, for the time to first notification
+        self.firstNs = None
+
+    def restart(self):
+        """Measure the time to first notification again, from a new subscription request"""
+        self.requestNs = time.monotonic_ns()
+        self.firstNs = None
+
+    def update(self, data, fields, monoNs):
+        """Count a packet, and return whether it should be shown in the output log"""
+        if self.firstNs is None:
+            self.firstNs = monoNs
+        self.received += 1
+        self.receivedBytes += len(data)
+        changed = data != self.lastData
+        self.lastData = bytes(data)
+        self.lastFields = fields
+
+        if self.displayMode == "all":
+            display = True
+        elif self.displayMode == "rate":
+            display = monoNs >= self.nextShowNs
+            if display:
+                self.nextShowNs = monoNs + self.minInterval
+        elif self.displayMode == "changes":
+            display = changed
+        else:
+            display = False
+        if display:
+            self.shown += 1
+        return display
+
+    def tableRow(self):
+        """Return the subscriptions table row, with the packet rate since the previous call"""
+        now = time.monotonic()
+        received = self.received
+        lastTime, lastReceived = self.tableSnapshot
+        rate = (received - lastReceived) / (now - lastTime) if now > lastTime else 0.0
+        self.tableSnapshot = (now, received)
+        label = next(k for k, v in NOTIFY_DISPLAY_MODES.items() if v == self.displayMode)
+        if self.lastData is None:
+            value = ""
+        elif self.lastFields:
+            value = formatDecodedFields(self.lastFields)
+        else:
+            value = self.lastData.hex(" ")
+        return (label, received, self.shown, f"{rate:.1f}", value)
+
+RULE_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+RULE_ACTIONS = ("write", "subscribe", "unsubscribe", "mark", "start_capture", "stop_capture")
+
+def compileRuleCondition(spec):
+    """Compile a rule condition into a predicate(data, fields)
+
+    A condition is {"field": NAME, "op": OP, "value": VALUE} on a decoded field,
+    {"byte": INDEX, "op": OP, "value": VALUE} on a payload byte, {"bytes": PATTERN}
+    on the payload (see parsePayloadPattern), or {"all": [...]}, {"any": [...]}
+    or {"not": CONDITION}. An empty condition is always true.
+    """
+    if not spec:
+        return lambda data, fields: True
+    if "all" in spec:
+        predicates = [compileRuleCondition(c) for c in spec["all"]]
+        return lambda data, fields: all(p(data, fields) for p in predicates)
+    if "any" in spec:
+        predicates = [compileRuleCondition(c) for c in spec["any"]]
+        return lambda data, fields: any(p(data, fields) for p in predicates)
+    if "not" in spec:
+        predicate = compileRuleCondition(spec["not"])
+        return lambda data, fields: not predicate(data, fields)
+    if "bytes" in spec:
+        pattern = parsePayloadPattern(spec["bytes"])
+        return lambda data, fields: pattern.search(data) is not None
+
+    compare = RULE_OPERATORS.get(spec.get("op", "=="))
+    if compare is None:
+        raise ValueError(f"Unknown operator: {spec.get('op')}")
+    value = spec.get("value")
+    if "field" in spec:
+        name = spec["field"]
+
+        def fieldPredicate(data, fields):
+            fieldValue = fields.get(name) if fields else None
+            try:
+                return fieldValue is not None and compare(fieldValue, value)
+            except TypeError:
+                return False
+        return fieldPredicate
+    if "byte" in spec:
+        index = int(spec["byte"])
+        return lambda data, fields: index < len(data) and compare(data[index], value)
+    raise ValueError(f"Invalid condition: {json.dumps(spec)}")
+
+class Rule:
+    """A compiled rule: a condition on the notifications of a characteristic, and the actions it triggers"""
+    def __init__(self, spec, number):
+        self.name = spec.get("name") or f"rule {number}"
+        if "char" not in spec:
+            raise ValueError(f"{self.name}: missing characteristic ('char')")
+        self.char = spec["char"]
+        self.condition = compileRuleCondition(spec.get("when"))
+        self.actions = spec.get("actions", [])
+        for action in self.actions:
+            if action.get("do") not in RULE_ACTIONS:
+                raise ValueError(f"{self.name}: unknown action {action.get('do')!r}")
+            if action["do"] in ("write", "subscribe", "unsubscribe") and "char" not in action:
+                raise ValueError(f"{self.name}: {action['do']} action without characteristic ('char')")
+            if action["do"] == "write":
+                if "hex" not in action:
+                    raise ValueError(f"{self.name}: write action without value ('hex')")
+                try:
+                    bytes.fromhex(action["hex"].replace(" ", ""))
+                except (AttributeError, ValueError):
+                    raise ValueError(f"{self.name}: invalid hex value {action['hex']!r}")
+        self.once = bool(spec.get("once", False))
+        self.cooldownNs = int(float(spec.get("cooldown", 0)) * 1e9)
+        self.enabled = True
+        self.evaluations = 0
+        self.hits = 0
+        self.evalNs = 0
+        self.lastHitNs = None
+
+    def stats(self):
+        """Describe the hit count and evaluation cost of the rule"""
+        cost = f", mean evaluation {self.evalNs / self.evaluations / 1000:.1f} us" if self.evaluations else ""
+        state = "" if self.enabled else " (disabled after its first hit)"
+        return f"{self.hits} hit(s) in {self.evaluations} evaluation(s){cost}{state}"
+
+def loadRules(path):
+    """Load and compile the rules of a JSON rules file (a list of rule objects)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        specs = json.load(f)
+    if not isinstance(specs, list):
+        raise ValueError("The rules file must contain a list of rules")
+    return [Rule(spec, number) for number, spec in enumerate(specs, 1)]
+
+class RuleEngine:
+    """Evaluates the rules on every notification, in the BLE event loop
+
+    bind() resolves the characteristic of every rule once per connection, so
+    that the rules of a notification are found by handle; evaluate() returns
+    the rules triggered by a notification, and keeps their statistics.
+    """
+    def __init__(self, rules):
+        self.rules = rules
+        self.byHandle = {}
+
+    def bind(self, characteristics):
+        """Attach the rules to the characteristics of a new connection, returning the errors"""
+        byHandle = {}
+        errors = []
+        for rule in self.rules:
+            try:
+                char = characteristics.resolve(rule.char, ("notify", "indicate"))
+            except ValueError as e:
+                errors.append(f"{rule.name}: {str(e)}")
+                continue
+            byHandle.setdefault(char.handle, []).append(rule)
+        self.byHandle = byHandle
+        return errors
+
+    def evaluate(self, handle, data, fields, monoNs):
+        """Return the rules triggered by a notification"""
+        triggered = []
+        for rule in self.byHandle.get(handle, ()):
+            if not rule.enabled:
+                continue
+            start = time.perf_counter_ns()
+            try:
+                hit = rule.condition(data, fields)
+            except Exception:
+                hit = False
+            rule.evalNs += time.perf_counter_ns() - start
+            rule.evaluations += 1
+            if not hit or (rule.lastHitNs is not None and monoNs - rule.lastHitNs < rule.cooldownNs):
+                continue
+            rule.hits += 1
+            rule.lastHitNs = monoNs
+            if rule.once:
+                rule.enabled = False
+            triggered.append(rule)
+        return triggered
+
+OP_TABLE_INTERVAL_MS = 200  # Refresh interval of the in-flight operations table
+
+class OperationCancelled(Exception):
+    """A BLE operation was cancelled from the in-flight operations table"""
+
+class OperationStats:
+    """Outcome counters and latency of one type of BLE operation"""
+    def __init__(self):
+        self.outcomes = {"ok": 0, "error": 0, "timeout": 0, "cancelled": 0}
+        self.totalLatency = 0.0
+        self.maxLatency = 0.0
+
+    def record(self, outcome, latency):
+        self.outcomes[outcome] += 1
+        if outcome == "ok":
+            self.totalLatency += latency
+            self.maxLatency = max(self.maxLatency, latency)
+
+    def summary(self):
+        """Describe the outcomes and the latency of the successful operations"""
+        total = sum(self.outcomes.values())
+        ok = self.outcomes["ok"]
+        text = f"{total} ops, " + ", ".join(f"{count} {outcome}" for outcome, count in self.outcomes.items())
+        if ok:
+            text += f", mean latency {self.totalLatency / ok * 1000:.0f} ms, max {self.maxLatency * 1000:.0f} ms"
+        return text
 
 class BLEScanner:
     def __init__(self, root, cmdArgs):
@@ -39,38 +2367,130 @@ class BLEScanner:
         
         self.client: Optional[BleakClient] = None
         self.scanning = False
-        self.readableCharacteristics = {}  # Store readable characteristics
-        self.writableCharacteristics = {}  # Store writable characteristics
-        self.notifiableCharacteristics = {}  # Store notifiable/indicatable characteristics
-        self.activeNotifications = {}  # Track active notifications
+        self.characteristics = CharacteristicIndex()  # Characteristics of the connected device, by handle
+        self.activeNotifications = {}  # Track active notifications (NotificationSubscription of each characteristic handle)
         self.loop = None  # Store the event loop
         self.discoveredDevices = []  # Store discovered devices
         self.deviceAdvData = {}  # Store advertisement data
+        self.deviceAdvStats = {}  # Store advertisement counters (total, distinct, last RSSI)
+        self.deviceAdvDecoded = {}  # Store decoded advertisement payloads
+        self.deviceAddress = None  # Address of the connected device
+        self.deviceCache = {}  # BLEDevice objects seen by recent scans, with the time they were last seen
+        self.connectTimings = {}  # Time-to-connect breakdown of the current connection
+        self.poller = None  # Read polling scheduler of the current connection
+        self.treeItems = {}  # Characteristic/descriptor objects of the GATT tree nodes
+        self.treeRead = set()  # GATT tree nodes whose value has been read (or is being read)
+        self.inflightOps = {}  # In-flight operations: id -> (kind, label, start time, task)
+        self.operationCount = 0
+        self.cancelledOps = set()  # In-flight operations cancelled from the UI
+        self.operationStats = {}  # OperationStats of each type of operation
 
         # Command line arguments
         self.serviceUuid = cmdArgs.svc_uuid
         self.deviceNamePrefix = cmdArgs.dev_name_prefix
         self.scanDuration = cmdArgs.scan_duration
         self.logFile = cmdArgs.log_file
-        self.logFileHandle = None
+        self.logWriter = None
         self.textFontSize = cmdArgs.text_font_size
         self.autoScan = cmdArgs.auto_scan
+        self.connectAddress = cmdArgs.connect
+        self.scanStopCount = cmdArgs.scan_stop_count
+        self.scanStopOn = cmdArgs.scan_stop_on
+        self.passiveScan = cmdArgs.passive_scan
+        self.scanDone = None  # Future resolved to end the current scan early
+        self.logAdvChanges = cmdArgs.log_adv_changes
+        self.autoReconnect = cmdArgs.auto_reconnect
+        self.lazyExplore = cmdArgs.lazy_explore
+        self.opTimeout = cmdArgs.op_timeout
+        self.reconnectStats = {"drops": 0, "reconnects": 0, "downtime": [], "latency": []}
+        self.advFormatFilter = cmdArgs.adv_format
+        self.adapterPool = None  # Adapters scanned simultaneously, when more than the default one is used
+        if cmdArgs.adapters:
+            self.adapterPool = AdapterPool(adapter.strip() for adapter in cmdArgs.adapters.split(",") if adapter.strip())
+        self.connectionAdapter = None  # Adapter of the current connection (placed by the adapter pool)
+
+        # Open the registry of the devices seen across sessions
+        self.registry = None
+        self.presentDevices = set()  # Addresses (upper case) seen by the current or last scan
+        if cmdArgs.registry:
+            try:
+                self.registry = DeviceRegistry(cmdArgs.registry)
+            except Exception as e:
+                print(f"Warning: Could not open device registry '{cmdArgs.registry}': {e}")
+
+        # Load vendor advertisement parsers
+        for parsersFile in cmdArgs.adv_parsers or []:
+            try:
+                loadAdvertisementParsers(parsersFile)
+            except Exception as e:
+                print(f"Warning: Could not load advertisement parsers from '{parsersFile}': {e}")
+
+        # Load the notification rules
+        self.ruleEngine = None
+        if cmdArgs.rules:
+            try:
+                self.ruleEngine = RuleEngine(loadRules(cmdArgs.rules))
+            except Exception as e:
+                print(f"Warning: Could not load rules from '{cmdArgs.rules}': {e}")
+
+        # Load vendor characteristic decoders
+        for decodersFile in cmdArgs.char_decoders or []:
+            try:
+                loadCharacteristicDecoders(decodersFile)
+            except Exception as e:
+                print(f"Warning: Could not load characteristic decoders from '{decodersFile}': {e}")
+
+        # Live chart of decoded characteristic fields
+        self.plotSeries = {}  # PlotSeries of each decoded numeric field, keyed by "<uuid> <field>"
+        self.plotLines = {}  # Canvas items of each plotted field
 
         # Open log file if specified
         if self.logFile:
             try:
-                self.logFileHandle = open(self.logFile, 'a', encoding='utf-8')
-                self._write_to_log_file(f"\n{'='*80}\n")
-                self._write_to_log_file(f"BLE Explorer Log - Session started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                self._write_to_log_file(f"{'='*80}\n")
+                self.logWriter = LogFileWriter(self.logFile)
+                self.logWriter.write(f"\n{'='*80}\n")
+                self.logWriter.write(f"BLE Explorer Log - Session started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                self.logWriter.write(f"{'='*80}\n")
             except Exception as e:
                 print(f"Warning: Could not open log file '{self.logFile}': {e}")
-                self.logFileHandle = None
+                self.logWriter = None
+
+        # Capture all session events so they can be exported
+        self.capture = SessionCapture(cmdArgs.capture_file)
+        self.capturing = True  # Paused and resumed by the stop_capture and start_capture rule actions
+        self.eventIndex = EventIndex(cmdArgs.search_index_size)
+        self.searchResults = []  # Event numbers found by the last search
+
+        # Publish the session events to local subscribers if requested
+        self.publisher = None
+        if cmdArgs.publish:
+            try:
+                self.publisher = EventPublisher(
+                    cmdArgs.publish,
+                    publishFormat=cmdArgs.publish_format,
+                    queueSize=cmdArgs.publish_queue,
+                    commandHandler=self.handleRemoteCommand,
+                    allowRemote=cmdArgs.publish_remote
+                )
+                print(f"Publishing session events on {cmdArgs.publish}")
+            except Exception as e:
+                print(f"Warning: Could not open publish endpoint '{cmdArgs.publish}': {e}")
         
         # Create UI
         self.createWidgets()
         
     def createWidgets(self):
+        # Menu bar
+        menuBar = tk.Menu(self.root)
+        fileMenu = tk.Menu(menuBar, tearoff=0)
+        fileMenu.add_command(label="Export Session...", command=self.exportSession)
+        menuBar.add_cascade(label="File", menu=fileMenu)
+        rulesMenu = tk.Menu(menuBar, tearoff=0)
+        rulesMenu.add_command(label="Load Rules...", command=self.loadRulesFile)
+        rulesMenu.add_command(label="Show Rule Stats", command=self.showRuleStats)
+        menuBar.add_cascade(label="Rules", menu=rulesMenu)
+        self.root.config(menu=menuBar)
+
         # Create main container with scrollbar
         mainContainer = ttk.Frame(self.root)
         mainContainer.pack(fill=tk.BOTH, expand=True)
@@ -132,6 +2552,16 @@ class BLEScanner:
         
         self.scanButton = ttk.Button(topFrame, text="Scan", command=self.toggleScan)
         self.scanButton.pack(side=tk.LEFT, padx=5)
+
+        # Tk variables must only be accessed from the main thread, so the BLE
+        # event loop reads the option values from plain attributes
+        self.logAdvChangesVar = tk.BooleanVar(value=self.logAdvChanges)
+        ttk.Checkbutton(
+            topFrame,
+            text="Log Adv Changes",
+            variable=self.logAdvChangesVar,
+            command=lambda: setattr(self, "logAdvChanges", self.logAdvChangesVar.get())
+        ).pack(side=tk.LEFT, padx=5)
         
         self.statusLabel = ttk.Label(topFrame, text="Ready", foreground="blue")
         self.statusLabel.pack(side=tk.LEFT, padx=20)
@@ -178,6 +2608,22 @@ class BLEScanner:
         )
         self.connectButton.pack(side=tk.LEFT, padx=5)
 
+        self.autoReconnectVar = tk.BooleanVar(value=self.autoReconnect)
+        ttk.Checkbutton(
+            buttonsFrame,
+            text="Auto Reconnect",
+            variable=self.autoReconnectVar,
+            command=lambda: setattr(self, "autoReconnect", self.autoReconnectVar.get())
+        ).pack(side=tk.LEFT, padx=5)
+
+        self.lazyExploreVar = tk.BooleanVar(value=self.lazyExplore)
+        ttk.Checkbutton(
+            buttonsFrame,
+            text="Lazy Explore",
+            variable=self.lazyExploreVar,
+            command=lambda: setattr(self, "lazyExplore", self.lazyExploreVar.get())
+        ).pack(side=tk.LEFT, padx=5)
+
         style = ttk.Style()
         style.configure("Red.TButton", foreground="red")
 
@@ -189,7 +2635,49 @@ class BLEScanner:
             state=tk.DISABLED
         )
         self.disconnectButton.pack(side=tk.RIGHT, padx=5)
-        
+
+        # Known devices frame (devices recorded by the registry in this and previous sessions)
+        if self.registry:
+            knownFrame = ttk.LabelFrame(container, text="Known Devices", padding="10")
+            knownFrame.pack(fill=tk.X, padx=10, pady=5)
+
+            knownFieldsFrame = ttk.Frame(knownFrame)
+            knownFieldsFrame.pack(fill=tk.X)
+            ttk.Label(knownFieldsFrame, text="Name Prefix:").pack(side=tk.LEFT)
+            self.knownNameEntry = ttk.Entry(knownFieldsFrame, width=15)
+            self.knownNameEntry.pack(side=tk.LEFT, padx=5)
+            ttk.Label(knownFieldsFrame, text="Service UUID:").pack(side=tk.LEFT, padx=(10, 0))
+            self.knownServiceEntry = ttk.Entry(knownFieldsFrame, width=20)
+            self.knownServiceEntry.pack(side=tk.LEFT, padx=5)
+            for entry in (self.knownNameEntry, self.knownServiceEntry):
+                entry.bind("<Return>", lambda event: self.refreshKnownDevices())
+            ttk.Button(knownFieldsFrame, text="Look Up", command=self.refreshKnownDevices).pack(side=tk.LEFT, padx=5)
+            ttk.Button(knownFieldsFrame, text="Connect", command=self.connectToKnownDevice).pack(side=tk.LEFT, padx=5)
+            self.knownStatusLabel = ttk.Label(knownFieldsFrame, text="")
+            self.knownStatusLabel.pack(side=tk.LEFT, padx=10)
+
+            self.knownTable = ttk.Treeview(
+                knownFrame,
+                columns=("present", "name", "address", "services", "manufacturers", "last_seen", "sightings", "rssi"),
+                show="headings",
+                height=6
+            )
+            for column, heading, width in (
+                ("present", "Present", 55),
+                ("name", "Name", 160),
+                ("address", "Address", 150),
+                ("services", "Services", 180),
+                ("manufacturers", "Manufacturers", 100),
+                ("last_seen", "Last Seen", 140),
+                ("sightings", "Sightings", 70),
+                ("rssi", "RSSI min/mean/max", 120),
+            ):
+                self.knownTable.heading(column, text=heading)
+                self.knownTable.column(column, width=width, stretch=column in ("name", "services"))
+            self.knownTable.pack(fill=tk.X, pady=(5, 0))
+            # Double-click a known device to connect to it
+            self.knownTable.bind("<Double-1>", lambda event: self.connectToKnownDevice())
+
         # Separator
         ttk.Separator(container, orient=tk.HORIZONTAL).pack(fill=tk.X, pady=5)
         
@@ -207,6 +2695,42 @@ class BLEScanner:
             font=("Consolas", self.textFontSize)
         )
         self.outputText.pack(fill=tk.BOTH, expand=True, pady=5)
+
+        # GATT tree frame
+        gattFrame = ttk.LabelFrame(container, text="GATT Services", padding="10")
+        gattFrame.pack(fill=tk.X, padx=10, pady=5)
+
+        treeContainer = ttk.Frame(gattFrame)
+        treeContainer.pack(fill=tk.BOTH, expand=True)
+
+        treeScrollbar = ttk.Scrollbar(treeContainer, orient=tk.VERTICAL)
+        self.gattTree = ttk.Treeview(
+            treeContainer,
+            columns=("handle", "properties", "value"),
+            height=10,
+            yscrollcommand=treeScrollbar.set
+        )
+        self.gattTree.heading("#0", text="Service / Characteristic / Descriptor")
+        self.gattTree.heading("handle", text="Handle")
+        self.gattTree.heading("properties", text="Properties")
+        self.gattTree.heading("value", text="Value")
+        self.gattTree.column("#0", width=380)
+        self.gattTree.column("handle", width=60, stretch=False)
+        self.gattTree.column("properties", width=200)
+        self.gattTree.column("value", width=320)
+        treeScrollbar.config(command=self.gattTree.yview)
+        treeScrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.gattTree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.gattTree.bind("<<TreeviewOpen>>", self._on_gatt_tree_open)
+        self.gattTree.bind("<<TreeviewSelect>>", self._on_gatt_tree_select)
+
+        self.readAllButton = ttk.Button(
+            gattFrame,
+            text="Read All",
+            command=self.readAllTreeValues,
+            state=tk.DISABLED
+        )
+        self.readAllButton.pack(anchor=tk.E, padx=5, pady=(5, 0))
         
         # Read characteristic frame
         readCharFrame = ttk.LabelFrame(container, text="Read Characteristic", padding="10")
@@ -217,14 +2741,46 @@ class BLEScanner:
         self.readCharUuidEntry = ttk.Entry(readCharFrame, width=40)
         self.readCharUuidEntry.grid(row=0, column=1, sticky=tk.EW, padx=5, pady=2)
         
-        # Read button
+        # Read and polling buttons
+        readButtonsFrame = ttk.Frame(readCharFrame)
+        readButtonsFrame.grid(row=1, column=1, sticky=tk.E, padx=5, pady=5)
+
+        ttk.Label(readButtonsFrame, text="Poll Interval (ms):").pack(side=tk.LEFT, padx=5)
+        self.pollIntervalEntry = ttk.Entry(readButtonsFrame, width=7)
+        self.pollIntervalEntry.insert(0, "1000")
+        self.pollIntervalEntry.pack(side=tk.LEFT, padx=5)
+
+        self.pollStartButton = ttk.Button(
+            readButtonsFrame,
+            text="Start Polling",
+            command=self.startCharPolling,
+            state=tk.DISABLED
+        )
+        self.pollStartButton.pack(side=tk.LEFT, padx=5)
+
+        self.pollStopButton = ttk.Button(
+            readButtonsFrame,
+            text="Stop Polling",
+            command=self.stopCharPolling,
+            state=tk.DISABLED
+        )
+        self.pollStopButton.pack(side=tk.LEFT, padx=5)
+
+        self.pollStatsButton = ttk.Button(
+            readButtonsFrame,
+            text="Poll Stats",
+            command=self.showPollStats,
+            state=tk.DISABLED
+        )
+        self.pollStatsButton.pack(side=tk.LEFT, padx=5)
+
         self.readCharButton = ttk.Button(
-            readCharFrame, 
+            readButtonsFrame, 
             text="Read Value", 
             command=self.readCharacteristic,
             state=tk.DISABLED
         )
-        self.readCharButton.grid(row=1, column=1, sticky=tk.E, padx=5, pady=5)
+        self.readCharButton.pack(side=tk.LEFT, padx=(20, 5))
         
         # Configure grid weights
         readCharFrame.columnconfigure(1, weight=1)
@@ -293,40 +2849,225 @@ class BLEScanner:
             state=tk.DISABLED
         )
         self.notifyCharDisableButton.pack(side=tk.LEFT, padx=5)
+
+        # Display mode of the notifications in the output log
+        displayFrame = ttk.Frame(notifyCharFrame)
+        displayFrame.grid(row=1, column=0, columnspan=2, sticky=tk.W, padx=5, pady=5)
+        ttk.Label(displayFrame, text="Display:").pack(side=tk.LEFT)
+        self.notifyDisplayMode = ttk.Combobox(
+            displayFrame,
+            values=list(NOTIFY_DISPLAY_MODES),
+            state="readonly",
+            width=18
+        )
+        self.notifyDisplayMode.current(0)
+        self.notifyDisplayMode.pack(side=tk.LEFT, padx=5)
+        ttk.Label(displayFrame, text="Max/s:").pack(side=tk.LEFT, padx=(10, 0))
+        self.notifyMaxRateEntry = ttk.Entry(displayFrame, width=5)
+        self.notifyMaxRateEntry.insert(0, "2")
+        self.notifyMaxRateEntry.pack(side=tk.LEFT, padx=5)
+
+        # Active subscriptions, with their counters and latest value
+        self.notifyTable = ttk.Treeview(
+            notifyCharFrame,
+            columns=("display", "received", "shown", "rate", "value"),
+            height=4
+        )
+        self.notifyTable.heading("#0", text="Characteristic")
+        self.notifyTable.heading("display", text="Display")
+        self.notifyTable.heading("received", text="Received")
+        self.notifyTable.heading("shown", text="Shown")
+        self.notifyTable.heading("rate", text="Rate (/s)")
+        self.notifyTable.heading("value", text="Latest Value")
+        self.notifyTable.column("#0", width=280)
+        self.notifyTable.column("display", width=120, stretch=False)
+        self.notifyTable.column("received", width=80, stretch=False)
+        self.notifyTable.column("shown", width=80, stretch=False)
+        self.notifyTable.column("rate", width=70, stretch=False)
+        self.notifyTable.column("value", width=380)
+        self.notifyTable.grid(row=2, column=0, columnspan=2, sticky=tk.EW, padx=5, pady=(5, 0))
+        self.root.after(NOTIFY_TABLE_INTERVAL_MS, self._refresh_notify_table)
         
         # Configure grid weights
         notifyCharFrame.columnconfigure(1, weight=1)
 
-        # If requested, start a device scan...
-        if self.autoScan:
+        # In-flight operations frame
+        opsFrame = ttk.LabelFrame(container, text="In-flight Operations", padding="10")
+        opsFrame.pack(fill=tk.X, padx=10, pady=5)
+
+        self.opsTable = ttk.Treeview(
+            opsFrame,
+            columns=("type", "target", "elapsed"),
+            show="headings",
+            height=3
+        )
+        self.opsTable.heading("type", text="Type")
+        self.opsTable.heading("target", text="Target")
+        self.opsTable.heading("elapsed", text="Elapsed (s)")
+        self.opsTable.column("type", width=100, stretch=False)
+        self.opsTable.column("target", width=500)
+        self.opsTable.column("elapsed", width=90, stretch=False)
+        self.opsTable.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+
+        opsButtonsFrame = ttk.Frame(opsFrame)
+        opsButtonsFrame.pack(side=tk.LEFT, fill=tk.Y, padx=5)
+        self.cancelOpButton = ttk.Button(
+            opsButtonsFrame,
+            text="Cancel",
+            command=self.cancelSelectedOperations
+        )
+        self.cancelOpButton.pack(fill=tk.X, pady=2)
+        self.cancelAllOpsButton = ttk.Button(
+            opsButtonsFrame,
+            text="Cancel All",
+            command=self.cancelAllOperations
+        )
+        self.cancelAllOpsButton.pack(fill=tk.X, pady=2)
+        self.opStatsButton = ttk.Button(
+            opsButtonsFrame,
+            text="Op Stats",
+            command=self.showOperationStats
+        )
+        self.opStatsButton.pack(fill=tk.X, pady=2)
+        self.root.after(OP_TABLE_INTERVAL_MS, self._refresh_ops_table)
+
+        # Session search frame
+        searchFrame = ttk.LabelFrame(container, text="Search Session", padding="10")
+        searchFrame.pack(fill=tk.X, padx=10, pady=5)
+
+        searchFieldsFrame = ttk.Frame(searchFrame)
+        searchFieldsFrame.pack(fill=tk.X)
+        ttk.Label(searchFieldsFrame, text="Kind:").pack(side=tk.LEFT)
+        self.searchKind = ttk.Combobox(
+            searchFieldsFrame,
+            values=["any"] + list(EVENT_KINDS),
+            state="readonly",
+            width=7
+        )
+        self.searchKind.current(0)
+        self.searchKind.pack(side=tk.LEFT, padx=5)
+        ttk.Label(searchFieldsFrame, text="Device:").pack(side=tk.LEFT, padx=(10, 0))
+        self.searchDeviceEntry = ttk.Entry(searchFieldsFrame, width=19)
+        self.searchDeviceEntry.pack(side=tk.LEFT, padx=5)
+        ttk.Label(searchFieldsFrame, text="Char:").pack(side=tk.LEFT, padx=(10, 0))
+        self.searchCharEntry = ttk.Entry(searchFieldsFrame, width=12)
+        self.searchCharEntry.pack(side=tk.LEFT, padx=5)
+        ttk.Label(searchFieldsFrame, text="From/To (s):").pack(side=tk.LEFT, padx=(10, 0))
+        self.searchFromEntry = ttk.Entry(searchFieldsFrame, width=7)
+        self.searchFromEntry.pack(side=tk.LEFT, padx=(5, 0))
+        self.searchToEntry = ttk.Entry(searchFieldsFrame, width=7)
+        self.searchToEntry.pack(side=tk.LEFT, padx=5)
+        ttk.Label(searchFieldsFrame, text="Payload:").pack(side=tk.LEFT, padx=(10, 0))
+        self.searchPayloadEntry = ttk.Entry(searchFieldsFrame, width=16)
+        self.searchPayloadEntry.pack(side=tk.LEFT, padx=5)
+        self.searchPayloadEntry.bind("<Return>", lambda event: self.searchEvents())
+        self.searchButton = ttk.Button(searchFieldsFrame, text="Search", command=self.searchEvents)
+        self.searchButton.pack(side=tk.LEFT, padx=5)
+        self.searchResultsButton = ttk.Button(
+            searchFieldsFrame,
+            text="Back to Results",
+            command=lambda: self._show_search_events(self.searchResults),
+            state=tk.DISABLED
+        )
+        self.searchResultsButton.pack(side=tk.LEFT, padx=5)
+
+        self.searchStatusLabel = ttk.Label(
+            searchFrame,
+            text="Payload: hex bytes with ?? wildcards (e.g. 80 ?? 01), or re: and a regex (e.g. re:^\\x80.[^\\x01])"
+        )
+        self.searchStatusLabel.pack(anchor=tk.W, pady=(5, 0))
+
+        self.searchTable = ttk.Treeview(
+            searchFrame,
+            columns=("time", "kind", "device", "char", "data", "fields"),
+            show="headings",
+            height=8
+        )
+        for column, heading, width in (
+            ("time", "Time (s)", 80),
+            ("kind", "Kind", 60),
+            ("device", "Device", 150),
+            ("char", "Char", 90),
+            ("data", "Data", 250),
+            ("fields", "Decoded", 300),
+        ):
+            self.searchTable.heading(column, text=heading)
+            self.searchTable.column(column, width=width, stretch=column in ("data", "fields"))
+        self.searchTable.pack(fill=tk.X, pady=(5, 0))
+        # Double-click a result to show the events around it
+        self.searchTable.bind("<Double-1>", self._on_search_result_open)
+
+        # Live chart frame
+        chartFrame = ttk.LabelFrame(container, text="Live Chart", padding="10")
+        chartFrame.pack(fill=tk.X, padx=10, pady=5)
+
+        chartFieldsFrame = ttk.Frame(chartFrame)
+        chartFieldsFrame.pack(side=tk.LEFT, fill=tk.Y)
+        ttk.Label(chartFieldsFrame, text="Decoded Fields:").pack(anchor=tk.W)
+        self.chartFieldsListbox = tk.Listbox(
+            chartFieldsFrame,
+            height=8,
+            width=34,
+            selectmode=tk.MULTIPLE,
+            exportselection=False,
+            font=("Consolas", self.textFontSize)
+        )
+        self.chartFieldsListbox.pack(fill=tk.Y, expand=True, pady=2)
+        windowFrame = ttk.Frame(chartFieldsFrame)
+        windowFrame.pack(fill=tk.X)
+        ttk.Label(windowFrame, text="Window (s):").pack(side=tk.LEFT)
+        self.chartWindowEntry = ttk.Entry(windowFrame, width=6)
+        self.chartWindowEntry.insert(0, "30")
+        self.chartWindowEntry.pack(side=tk.LEFT, padx=5)
+
+        self.chartCanvas = tk.Canvas(chartFrame, height=200, background="white", highlightthickness=0)
+        self.chartCanvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(10, 0))
+
+        # Redraw the chart at a capped frame rate, independent of the notification rate
+        self.root.after(PLOT_FRAME_INTERVAL_MS, self._redraw_chart)
+
+        # Show the devices seen in previous sessions
+        if self.registry:
+            self.refreshKnownDevices()
+
+        # If requested, connect directly to a device, or start a device scan...
+        if self.connectAddress:
+            self.connectToAddress(self.connectAddress)
+        elif self.autoScan:
             self.toggleScan()
         
-    def log(self, message):
-        """Thread-safe logging to the text widget"""
-        self.root.after(0, self._log_impl, message)
+    def log(self, message, display=True):
+        """Thread-safe logging to the text widget (unless display is False) and to the log file"""
+        # The message is queued to the log file writer right away, so the file gets every
+        # message in order even when the text widget only shows some of them
+        if self.logWriter:
+            self.logWriter.write(message + "\n")
+        if display:
+            self.root.after(0, self._log_impl, message)
         
     def _log_impl(self, message):
         self.outputText.insert(tk.END, message + "\n")
         self.outputText.see(tk.END)
-        # Write to log file if enabled
-        if self.logFileHandle:
-            self._write_to_log_file(message + "\n")
-            
-    def _write_to_log_file(self, text):
-        """Write text to log file and flush immediately"""
-        try:
-            self.logFileHandle.write(text)
-            self.logFileHandle.flush()
-        except Exception as e:
-            print(f"Error writing to log file: {e}")
+        
+    def recordEvent(self, kind, device, char, data, fields=None, monoNs=None):
+        """Send a session event to the capture and to the live subscribers (thread-safe)"""
+        event = makeEvent(kind, device, char, data, fields, monoNs)
+        if self.capturing:
+            self.capture.record(event)
+        self.eventIndex.add(event)
+        if self.publisher:
+            self.publisher.publish(event)
         
     def updateStatus(self, message, color="blue"):
         """Update status label"""
         self.root.after(0, lambda: self.statusLabel.config(text=message, foreground=color))
         
     def _enable_read_button(self):
-        """Enable the read button (must be called from main thread)"""
+        """Enable the read and polling buttons (must be called from main thread)"""
         self.readCharButton.config(state=tk.NORMAL)
+        self.pollStartButton.config(state=tk.NORMAL)
+        self.pollStopButton.config(state=tk.NORMAL)
+        self.pollStatsButton.config(state=tk.NORMAL)
         
     def _enable_write_button(self):
         """Enable the write button (must be called from main thread)"""
@@ -388,6 +3129,9 @@ class BLEScanner:
         self.scanDurationEntry.config(state=tk.DISABLED)
         self.deviceListbox.delete(0, tk.END)
         self.outputText.delete(1.0, tk.END)
+        if self.registry:
+            self.presentDevices = set()
+            self._refresh_known_present()
         
         # Run scan in separate thread
         thread = threading.Thread(target=self.runScan, args=(svcUuidFilter, uuidType, devNameFilter, scanDuration), daemon=True)
@@ -395,12 +3139,24 @@ class BLEScanner:
         
     def stopScan(self):
         self.scanning = False
+        # End the scan right away rather than waiting for the full scan duration
+        if self.loop and self.scanDone:
+            try:
+                self.loop.call_soon_threadsafe(self._end_scan)
+            except RuntimeError:
+                # The scan just ended and its event loop is closed
+                pass
         self.scanButton.config(text="Start Scan")
         self.serviceUuidEntry.config(state=tk.NORMAL)
         self.deviceNamePrefixEntry.config(state=tk.NORMAL)
         self.scanDurationEntry.config(state=tk.NORMAL)
         self.updateStatus("Scan stopped", "orange")
         
+    def _end_scan(self, reason=None):
+        """Resolve the scan future (must be called from the BLE event loop)"""
+        if self.scanDone and not self.scanDone.done():
+            self.scanDone.set_result(reason)
+
     def runScan(self, svcUuidFilter, uuidType, devNameFilter, scanDuration):
         """Run the BLE scan in an asyncio event loop"""
         self.loop = asyncio.new_event_loop()
@@ -434,16 +3190,73 @@ class BLEScanner:
             #self.log(f"  Full UUID: {full_uuid}")
         if devNameFilter:
             self.log(f"  Device Name Prefix: '{devNameFilter}'")
+        if self.advFormatFilter:
+            self.log(f"  Advertisement Format: '{self.advFormatFilter}'")
         self.log(f"Scan duration: {scanDuration} seconds")
+        if self.scanStopCount:
+            self.log(f"Stop after: {self.scanStopCount} matching device(s)")
+        if self.scanStopOn:
+            self.log(f"Stop when seen: {self.scanStopOn}")
+        if self.passiveScan:
+            self.log("Scanning mode: passive")
+        if self.adapterPool:
+            self.log(f"Adapters: {', '.join(self.adapterPool.adapters)}")
         self.log("-" * 80)
         self.updateStatus("Scanning...", "green")
         
         matchingDevices = []
+        matchingAddresses = set()
         deviceAdvData = {}  # Store advertisement data for each device
+        deviceAdvDecoded = {}  # Store decoded advertisement payloads for each device
+        advFormatFilter = self.advFormatFilter.lower() if self.advFormatFilter else None
+        advState = {}  # Per-device [fingerprint, total count, distinct count, last RSSI, last advertisement, BLEDevice]
+        logAdvChanges = self.logAdvChanges
+        stopCount = self.scanStopCount
+        stopOn = self.scanStopOn.upper() if self.scanStopOn else None
+        registry = self.registry
+        self.scanDone = asyncio.get_running_loop().create_future()
         
         def detectionCallback(device, advertisement_data):
             """Called when a device is detected"""
 
+            monoNs = time.monotonic_ns()
+
+            # Every advertisement of every device goes to the registry, whether it matches the filters or not
+            if registry:
+                registry.observe(
+                    device.address,
+                    advertisement_data.local_name or device.name,
+                    advertisement_data.service_uuids + list(advertisement_data.service_data),
+                    list(advertisement_data.manufacturer_data),
+                    advertisement_data.rssi
+                )
+
+            # Byte-identical repeats only update the counters
+            fingerprint = advertisementFingerprint(device, advertisement_data)
+            state = advState.get(device.address)
+            if state is not None:
+                state[1] += 1
+                state[3] = advertisement_data.rssi
+                if state[0] == fingerprint:
+                    return
+                previousAdv = state[4]
+                state[0] = fingerprint
+                state[2] += 1
+                state[4] = advertisement_data
+                if device.address in matchingAddresses:
+                    deviceAdvData[device.address] = advertisement_data
+                    deviceAdvDecoded[device.address] = decodeAdvertisement(advertisement_data)
+                    self.recordEvent("adv", device.address, None, b"", advertisementFields(advertisement_data, deviceAdvDecoded[device.address]), monoNs)
+                    if logAdvChanges:
+                        timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3]
+                        diff = advertisementDiff(previousAdv, advertisement_data)
+                        self.log(f"[{timestamp}] [ADV] {device.name or 'Unknown'} ({device.address}): {diff}")
+                    return
+            else:
+                advState[device.address] = [fingerprint, 1, 1, advertisement_data.rssi, advertisement_data, device]
+                if registry:
+                    self.root.after(0, self._mark_known_present, device.address.upper())
+
             # Check if device matches UUID filter (if specified)
             uuidMatch = True  # Default to True if no UUID filter
             if full_uuid:
@@ -458,22 +3271,61 @@ class BLEScanner:
                 device_name = device.name or ""
                 nameMatch = device_name.startswith(devNameFilter)
             
-            # Device must match both filters (if both are specified)
-            if uuidMatch and nameMatch:
-                # Avoid duplicates
-                if not any(d.address == device.address for d in matchingDevices):
-                    matchingDevices.append(device)
-                    deviceAdvData[device.address] = advertisement_data
-                    self.log(f"Found: {device.name or 'Unknown'} ({device.address})")
+            if not (uuidMatch and nameMatch):
+                return
+
+            # Decode the payloads, and check the advertisement format filter (if specified)
+            decoded = decodeAdvertisement(advertisement_data)
+            if advFormatFilter and not any(d["format"].lower().startswith(advFormatFilter) for d in decoded):
+                return
+
+            # Device must match all filters (if specified)
+            matchingAddresses.add(device.address)
+            matchingDevices.append(device)
+            deviceAdvData[device.address] = advertisement_data
+            deviceAdvDecoded[device.address] = decoded
+            self.recordEvent("adv", device.address, None, b"", advertisementFields(advertisement_data, decoded), monoNs)
+            formats = ", ".join(d["format"] for d in decoded)
+            self.log(f"Found: {device.name or 'Unknown'} ({device.address})" + (f" [{formats}]" if formats else ""))
+
+            # Stop scanning early when the target was found
+            if stopCount and len(matchingDevices) >= stopCount:
+                self._end_scan(f"found {stopCount} matching device(s)")
+            elif stopOn and (device.address.upper() == stopOn or (device.name or "").upper() == stopOn):
+                self._end_scan(f"found {self.scanStopOn}")
         
         try:
-            # Create scanner with callback
-            scanner = BleakScanner(detection_callback=detectionCallback)
-            
-            # Start scanning
-            await scanner.start()
-            await asyncio.sleep(scanDuration)
-            await scanner.stop()
+            # Create the scanners (one per adapter) with the callback, and start scanning
+            if self.adapterPool:
+                self.adapterPool.clearSightings()
+            scanners = None
+            if self.passiveScan:
+                try:
+                    scanners, adapterErrors = await startScanners(detectionCallback, self.adapterPool, scanning_mode="passive")
+                except Exception as e:
+                    self.log(f"Passive scanning not available ({str(e)}), using active scanning")
+                    scanners = None
+            if scanners is None:
+                scanners, adapterErrors = await startScanners(detectionCallback, self.adapterPool)
+            for error in adapterErrors:
+                self.log(f"Could not scan on adapter {error}")
+
+            # Scan for the full duration, unless the scan is ended early
+            scanStart = time.monotonic()
+            await asyncio.wait([self.scanDone], timeout=scanDuration)
+            await stopScanners(scanners)
+            if self.scanDone.done() and self.scanDone.result():
+                self.log(f"Scan stopped after {(time.monotonic() - scanStart) * 1000:.0f} ms: {self.scanDone.result()}")
+
+            # Remember every device seen, so it can be connected to without scanning again
+            scanEndTime = time.monotonic()
+            for address, state in advState.items():
+                self.deviceCache[address.upper()] = (state[5], scanEndTime)
+
+            # Show the sightings of this scan in the known devices table
+            if registry:
+                await asyncio.get_running_loop().run_in_executor(None, registry.flush)
+                self.root.after(0, self.refreshKnownDevices)
             
             if not self.scanning:
                 return
@@ -492,6 +3344,8 @@ class BLEScanner:
             # Store discovered devices and advertisement data
             self.discoveredDevices = matchingDevices
             self.deviceAdvData = deviceAdvData
+            self.deviceAdvDecoded = deviceAdvDecoded
+            self.deviceAdvStats = {addr: (state[1], state[2], state[3]) for addr, state in advState.items() if addr in matchingAddresses}
             
             self.log(f"\nFound {len(matchingDevices)} matching device(s)\n")
             
@@ -504,6 +3358,7 @@ class BLEScanner:
             self.updateStatus(f"Error: {str(e)}", "red")
         finally:
             self.scanning = False
+            self.scanDone = None
             self.root.after(0, lambda: self.scanButton.config(text="Start Scan"))
             self.root.after(0, lambda: self.serviceUuidEntry.config(state=tk.NORMAL))
             self.root.after(0, lambda: self.deviceNamePrefixEntry.config(state=tk.NORMAL))
@@ -514,13 +3369,67 @@ class BLEScanner:
         self.deviceListbox.delete(0, tk.END)
         for device in self.discoveredDevices:
             devName = f"{device.name or 'Unknown':30s} [{device.address}]"
+            formats = ", ".join(d["format"] for d in self.deviceAdvDecoded.get(device.address, []))
+            if formats:
+                devName += f"  {formats}"
+            if self.adapterPool:
+                devName += "  " + ", ".join(f"{adapter} {rssi} dBm" for adapter, rssi, count in self.adapterPool.seenBy(device.address))
             self.deviceListbox.insert(tk.END, devName)
         
         if self.discoveredDevices:
             self.connectButton.config(state=tk.NORMAL)
             self.showAdvDataButton.config(state=tk.NORMAL)
             self.deviceListbox.selection_set(0)  # Select first device by default
-            
+
+    def refreshKnownDevices(self):
+        """Show the known devices matching the name prefix and service UUID of the Known Devices frame"""
+        namePrefix = self.knownNameEntry.get().strip()
+        serviceUuid = self.knownServiceEntry.get().strip()
+        try:
+            devices = self.registry.lookup(namePrefix or None, serviceUuid or None)
+        except sqlite3.Error as e:
+            self.knownStatusLabel.config(text=f"Lookup failed: {e}")
+            return
+        self.knownTable.delete(*self.knownTable.get_children())
+        for device in devices:
+            rssi = ""
+            if device["rssi_mean"] is not None:
+                rssi = f"{device['rssi_min']}/{device['rssi_mean']:.0f}/{device['rssi_max']}"
+            self.knownTable.insert("", tk.END, iid=device["address"], values=(
+                "",
+                device["name"] or "Unknown",
+                device["address"],
+                ", ".join(shortUuid(u) for u in device["services"]),
+                ", ".join(f"0x{c:04X}" for c in device["manufacturers"]),
+                datetime.fromtimestamp(device["last_seen"]).strftime("%Y-%m-%d %H:%M:%S"),
+                device["sightings"],
+                rssi
+            ))
+        self._refresh_known_present()
+
+    def _refresh_known_present(self):
+        """Mark the known devices seen by the current or last scan (must be called from main thread)"""
+        rows = self.knownTable.get_children()
+        for address in rows:
+            self.knownTable.set(address, "present", "yes" if address in self.presentDevices else "")
+        present = sum(1 for address in rows if address in self.presentDevices)
+        self.knownStatusLabel.config(text=f"{len(rows)} known device(s), {present} present")
+
+    def _mark_known_present(self, address):
+        """Mark a known device as seen by the current scan (must be called from main thread)"""
+        self.presentDevices.add(address)
+        if self.knownTable.exists(address):
+            self.knownTable.set(address, "present", "yes")
+            self._refresh_known_present()
+
+    def connectToKnownDevice(self):
+        """Connect to the device selected in the known devices table"""
+        selection = self.knownTable.selection()
+        if not selection:
+            messagebox.showwarning("No Selection", "Please select a device from the known devices")
+            return
+        self.connectToAddress(selection[0])
+
     def connectToDevice(self):
         """Connect to the device selected in the listbox"""
         selection = self.deviceListbox.curselection()
@@ -543,6 +3452,31 @@ class BLEScanner:
         thread = threading.Thread(target=self.runConnect, args=(device,), daemon=True)
         thread.start()
         
+    def connectToAddress(self, address):
+        """Connect to a device by address, without scanning first if it was seen recently"""
+        self.outputText.delete(1.0, tk.END)
+        self.log(f"Connecting to: {address}")
+        self.updateStatus(f"Connecting to {address}...", "green")
+
+        # Disable buttons during connection
+        self.showAdvDataButton.config(state=tk.DISABLED)
+        self.connectButton.config(state=tk.DISABLED)
+
+        # Run connection in separate thread
+        thread = threading.Thread(target=self.runConnect, args=(address,), daemon=True)
+        thread.start()
+
+    async def resolveDevice(self, address, timeout):
+        """Return the BLEDevice for an address, from the recent scans cache or from a targeted discovery"""
+        cached = self.deviceCache.get(address.upper())
+        if cached and time.monotonic() - cached[1] < DEVICE_CACHE_MAX_AGE:
+            return cached[0]
+        # Discovery stops as soon as the device is seen
+        device = await BleakScanner.find_device_by_address(address, timeout=timeout)
+        if device:
+            self.deviceCache[address.upper()] = (device, time.monotonic())
+        return device
+
     def runConnect(self, device):
         """Run the connection in an asyncio event loop"""
         self.loop = asyncio.new_event_loop()
@@ -582,6 +3516,16 @@ class BLEScanner:
             # RSSI
             if advData.rssi is not None:
                 self.log(f"    RSSI: {advData.rssi} dBm")
+
+            # Advertisement counters
+            advStats = self.deviceAdvStats.get(device.address)
+            if advStats:
+                self.log(f"    Advertisements: {advStats[0]} received, {advStats[1]} distinct (last RSSI: {advStats[2]} dBm)")
+
+            # Adapters that received the advertisements
+            if self.adapterPool:
+                for adapter, rssi, count in self.adapterPool.seenBy(device.address):
+                    self.log(f"    Seen by {adapter}: {count} advertisement(s), last RSSI {rssi} dBm")
             
             # TX Power
             if advData.tx_power is not None:
@@ -606,6 +3550,13 @@ class BLEScanner:
                 for company_id, data in advData.manufacturer_data.items():
                     hex_data = " ".join(f"{b:02x}" for b in data)
                     self.log(f"        Company ID 0x{company_id:04x}: {hex_data}")
+
+            # Decoded payloads
+            decoded = self.deviceAdvDecoded.get(device.address)
+            if decoded:
+                self.log(f"    Decoded Data ({len(decoded)} entries):")
+                for fields in decoded:
+                    self.log(f"        {fields['format']} ({fields['source']}): {formatDecodedFields(fields)}")
             
             # Platform specific data
             if hasattr(advData, 'platform_data'):
@@ -624,123 +3575,259 @@ class BLEScanner:
             self.log("No advertisement data available for this device")
             
     async def connectAndExplore(self, device):
-        """Connect to device and read all services/characteristics"""
+        """Connect to device (a BLEDevice, or an address) and read all services/characteristics"""
+        pollerTask = None
         try:
-            self.client = BleakClient(device.address)
+            startTime = time.monotonic()
+            self.connectTimings = {}
+
+            # Passing the BLEDevice (rather than its address) to the client lets it connect
+            # right away, without another discovery
+            if isinstance(device, str):
+                address = device
+                device = await self.resolveDevice(address, float(self.scanDuration))
+                if device is None:
+                    self.log(f"Device {address} not found")
+                    self.updateStatus("Device not found", "red")
+                    self.root.after(0, lambda: self.showAdvDataButton.config(state=tk.NORMAL))
+                    self.root.after(0, lambda: self.connectButton.config(state=tk.NORMAL))
+                    return
+                self.connectTimings["resolve"] = time.monotonic() - startTime
+
+            self.deviceAddress = device.address
+            if self.adapterPool:
+                # Connect through the least-loaded adapter that saw the device
+                adapter, adapterDevice = self.adapterPool.acquire(device.address)
+                self.connectionAdapter = adapter
+                self.log(f"Connecting through adapter {adapter} (connections per adapter: {self.adapterPool.loadSummary()})")
+                # Without a BLEDevice of that adapter, the scanned one still spares another discovery
+                self.client = self.adapterPool.clientFactory(adapterDevice or device, adapter=adapter)
+            else:
+                self.client = BleakClient(device)
             await self.client.connect()
+            self.connectTimings["connect"] = time.monotonic() - startTime
             
             if not self.client.is_connected:
                 self.log("Failed to connect")
+                self._release_adapter()
                 self.root.after(0, lambda: self.showAdvDataButton.config(state=tk.NORMAL))
                 self.root.after(0, lambda: self.connectButton.config(state=tk.NORMAL))
                 return
             
             self.log("Connected successfully!\n")
             self.updateStatus("Connected - Reading services...", "green")
+
+            # Start the read polling scheduler
+            self.poller = ReadPoller(self.pollRead)
+            pollerTask = asyncio.ensure_future(self.poller.run())
             
             # Now that we are connected we can enable the disconnect button
             self.root.after(0, lambda: self.disconnectButton.config(state=tk.NORMAL))
             
-            # Get all services
+            # Get all services (discovered by connect(), so included in its time)
             services = self.client.services
             serviceList = list(services)
+            self.log(self.formatConnectTimings())
             
             # Sort services by UUID
             serviceList.sort(key=lambda s: s.uuid)
-            self.log(f"Device has {len(serviceList)} service(s):\n")
-            self.log("=" * 80)
 
-            self.readableCharacteristics.clear()            
-            self.writableCharacteristics.clear()
-            self.notifiableCharacteristics.clear()
-            
-            for service in serviceList:
-                self.log(f"\nService: {service.uuid}")
-                self.log(f"    Description: {service.description}")
-                self.log(f"    Characteristics: {len(service.characteristics)}")
-                
-                # Sort characteristics by UUID
-                charList = sorted(service.characteristics, key=lambda c: c.uuid)
+            # Show the services and characteristics in the GATT tree right away
+            self.root.after(0, self._populate_gatt_tree, serviceList)
+
+            # In lazy mode the values are only read when a tree node is expanded or selected
+            lazy = self.lazyExplore
+            if not lazy:
+                self.log(f"Device has {len(serviceList)} service(s):\n")
+                self.log("=" * 80)
+
+            self.characteristics.build(serviceList)
+            if self.ruleEngine:
+                for error in self.ruleEngine.bind(self.characteristics):
+                    self.log(f"Rule disabled for this device - {error}")
+
+            def onValue(char, value, fields, monoNs):
+                self.recordEvent("read", self.deviceAddress, self.characteristics.label(char), value, fields, monoNs)
+                self.root.after(0, self._set_gatt_tree_value, f"char:{char.handle}", formatTreeValue(value, fields))
+
+            def readValue(char):
+                return self.runOperation("read", self.characteristics.label(char), self.client.read_gatt_char(char))
+
+            def logRecord(char, record):
+                self.log(f"\n    Characteristic: {self.characteristics.label(char)}")
+                self.log(f"        Handle: {char.handle}")
+                self.log(f"        Description: {char.description}")
+                self.log(f"        Properties: {', '.join(char.properties)}")
+                if "value" in record:
+                    self.log(f"        Value (hex): {bytes.fromhex(record['value']).hex(' ')}")
+                if "string" in record:
+                    self.log(f"        Value (string): {record['string']}")
+                if "decoded" in record:
+                    self.log(f"        Decoded: {formatDecodedFields(record['decoded'])}")
+                if record.get("error") == "timeout":
+                    self.log(f"        Read timed out after {self.opTimeout:g} s")
+                elif "error" in record:
+                    self.log(f"        Read error: {record['error']}")
+
+            # Read and log the values (in lazy mode they are only read on demand from the GATT tree)
+            if not lazy:
+                for service in serviceList:
+                    self.log(f"\nService: {service.uuid}")
+                    self.log(f"    Description: {service.description}")
+                    self.log(f"    Characteristics: {len(service.characteristics)}")
                 
-                for char in charList:
-                    self.log(f"\n    Characteristic: {char.uuid}")
-                    self.log(f"        Description: {char.description}")
-                    self.log(f"        Properties: {', '.join(char.properties)}")
-                    
-                    # Store readable characteristics
-                    if "read" in char.properties:
-                        self.readableCharacteristics[char.uuid] = char
-                                            
-                    # Store writable characteristics
-                    if "write" in char.properties or "write-without-response" in char.properties:
-                        self.writableCharacteristics[char.uuid] = char
-                    
-                    # Store notifiable/indicatable characteristics
-                    if "notify" in char.properties or "indicate" in char.properties:
-                        self.notifiableCharacteristics[char.uuid] = char
-                    
-                    # Read characteristic if readable
-                    if "read" in char.properties:
-                        try:
-                            value = await self.client.read_gatt_char(char.uuid)
-                            # Format value as hex
-                            hex_value = " ".join(f"{b:02x}" for b in value)
-                            self.log(f"        Value (hex): {hex_value}")
-                            # Try to decode as string
-                            try:
-                                str_value = value.decode('utf-8', errors='ignore')
-                                if str_value.isprintable():
-                                    self.log(f"        Value (string): {str_value}")
-                            except:
-                                pass
-                        except Exception as e:
-                            self.log(f"        Read error: {str(e)}")
-                    
-                    # List descriptors
-                    #if char.descriptors:
-                    #    self.log(f"        Descriptors: {len(char.descriptors)}")
-                    #    for desc in char.descriptors:
-                    #        self.log(f"            - {desc.uuid}")
+                    # Each characteristic is logged as soon as it has been read
+                    await exploreService(service, readValue, onValue, logRecord)
                             
-            self.log("\n" + "=" * 80)
-            self.log("\nExploration complete!")
+            if not lazy:
+                self.log("\n" + "=" * 80)
+                self.log("\nExploration complete!")
+            else:
+                self.log(f"Device has {len(serviceList)} service(s), shown in the GATT Services tree")
+                self.log("Values are read when a characteristic is expanded or selected (or with \"Read All\")")
             
             self.log("\n")
-            if self.readableCharacteristics:
-                self.log(f"Found {len(self.readableCharacteristics)} readable characteristic(s)")
+            readable = self.characteristics.withProperties(("read",))
+            writable = self.characteristics.withProperties(("write", "write-without-response"))
+            notifiable = self.characteristics.withProperties(("notify", "indicate"))
+            if readable:
+                self.log(f"Found {len(readable)} readable characteristic(s)")
                 self.root.after(0, self._enable_read_button)
-            if self.writableCharacteristics:
-                self.log(f"Found {len(self.writableCharacteristics)} writable characteristic(s)")
+            if writable:
+                self.log(f"Found {len(writable)} writable characteristic(s)")
                 self.root.after(0, self._enable_write_button)
-            if self.notifiableCharacteristics:
-                self.log(f"Found {len(self.notifiableCharacteristics)} notifiable/indicatable characteristic(s)")
+            if notifiable:
+                self.log(f"Found {len(notifiable)} notifiable/indicatable characteristic(s)")
                 self.root.after(0, self._enable_notify_buttons)
             self.log("\n")
             
             self.updateStatus("Connected and ready", "blue")
             
-            # Keep the loop running for write operations
-            while self.client and self.client.is_connected:
-                await asyncio.sleep(0.1)
+            # Keep the loop running for write operations, and reconnect (if enabled) when the link drops
+            while True:
+                while self.client and self.client.is_connected:
+                    await asyncio.sleep(0.1)
+                if not self.client:
+                    # Disconnected by the user
+                    break
+                if self.autoReconnect and await self.reconnect():
+                    continue
+                if not self.client:
+                    # Disconnected by the user while reconnecting (already cleaned up)
+                    break
+                self.log("\nLink lost")
+                await self.asyncDisconnect()
+                break
+
+            pollerTask.cancel()
             
         except Exception as e:
+            if pollerTask:
+                pollerTask.cancel()
             self.log(f"\nConnection error: {str(e)}")
             self.updateStatus(f"Error: {str(e)}", "red")
             if self.client and self.client.is_connected:
                 await self.client.disconnect()
             self.client = None
-            self.readableCharacteristics.clear()
-            self.writableCharacteristics.clear()
-            self.notifiableCharacteristics.clear()
+            self._release_adapter()
+            self.characteristics.clear()
             self.activeNotifications.clear()
             self.root.after(0, lambda: self.showAdvDataButton.config(state=tk.NORMAL))
             self.root.after(0, lambda: self.connectButton.config(state=tk.NORMAL))            
             self.root.after(0, lambda: self.disconnectButton.config(state=tk.DISABLED))
             self.root.after(0, lambda: self.readCharButton.config(state=tk.DISABLED))
+            self.root.after(0, lambda: self.pollStartButton.config(state=tk.DISABLED))
+            self.root.after(0, lambda: self.pollStopButton.config(state=tk.DISABLED))
+            self.root.after(0, lambda: self.pollStatsButton.config(state=tk.DISABLED))
+            self.root.after(0, self._clear_gatt_tree)
             self.root.after(0, lambda: self.writeCharButton.config(state=tk.DISABLED))
             self.root.after(0, lambda: self.notifyCharEnableButton.config(state=tk.DISABLED))
             self.root.after(0, lambda: self.notifyCharDisableButton.config(state=tk.DISABLED))
             
+    def formatConnectTimings(self):
+        """Format the time-to-connect breakdown of the current connection"""
+        labels = (
+            ("resolve", "resolve"),
+            ("connect", "connect"),
+        )
+        parts = [f"{label} {self.connectTimings[key] * 1000:.0f} ms" for key, label in labels if key in self.connectTimings]
+        return "Time to " + ", ".join(parts)
+
+    async def reconnect(self):
+        """Reconnect after a link loss with exponential backoff and jitter, and restore the notifications
+
+        The characteristic tables of the first exploration are kept, so the
+        device is not explored again. Returns False if the reconnection was
+        abandoned (auto reconnect disabled or disconnected by the user).
+        """
+        dropTime = time.monotonic()
+        self.reconnectStats["drops"] += 1
+        self.recordEvent("link", self.deviceAddress, None, b"", {"state": "down"})
+        timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3]
+        self.log(f"\n[{timestamp}] Link lost - reconnecting...")
+        self.updateStatus("Link lost - reconnecting...", "orange")
+
+        attempt = 0
+        while self.client and self.autoReconnect:
+            attempt += 1
+            connectStart = time.monotonic()
+            client = self.client
+            try:
+                # dangerous_use_bleak_cache lets BlueZ reuse the services resolved on the first connection
+                await client.connect(dangerous_use_bleak_cache=True)
+            except Exception as e:
+                # Exponential backoff with "equal jitter": half of the delay is fixed, half is random
+                delay = min(RECONNECT_MAX_DELAY, RECONNECT_INITIAL_DELAY * 2 ** (attempt - 1))
+                delay = delay / 2 + random.uniform(0, delay / 2)
+                if not self.client:
+                    # Disconnected by the user during the attempt
+                    return False
+                self.log(f"Reconnect attempt {attempt} failed: {str(e)} (retrying in {delay:.1f} s)")
+                await asyncio.sleep(delay)
+                if not self.client:
+                    # Disconnected by the user during the backoff wait
+                    return False
+                continue
+            connectLatency = time.monotonic() - connectStart
+            if not self.client:
+                # Disconnected by the user while connecting: drop the link that was just established
+                try:
+                    await client.disconnect()
+                except Exception:
+                    pass
+                return False
+
+            # Restore the active notifications
+            for handle, subscription in list(self.activeNotifications.items()):
+                try:
+                    subscription.restart()
+                    await self.client.start_notify(subscription.char, self.handleNotification)
+                except Exception as e:
+                    self.log(f"Failed to restore notifications for {subscription.label}: {str(e)}")
+                    del self.activeNotifications[handle]
+
+            downtime = time.monotonic() - dropTime
+            self.reconnectStats["reconnects"] += 1
+            self.reconnectStats["downtime"].append(downtime)
+            self.reconnectStats["latency"].append(connectLatency)
+            self.recordEvent("link", self.deviceAddress, None, b"", {
+                "state": "up",
+                "attempts": attempt,
+                "downtime_s": round(downtime, 3),
+                "connect_latency_s": round(connectLatency, 3),
+                "restored_notifications": len(self.activeNotifications),
+            })
+            timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3]
+            self.log(f"[{timestamp}] Reconnected after {attempt} attempt(s): downtime {downtime:.2f} s, "
+                     f"connect latency {connectLatency:.2f} s, {len(self.activeNotifications)} notification(s) restored")
+            stats = self.reconnectStats
+            self.log(f"Reconnect stats: {stats['reconnects']}/{stats['drops']} link loss(es) recovered, "
+                     f"mean downtime {sum(stats['downtime']) / len(stats['downtime']):.2f} s, "
+                     f"max downtime {max(stats['downtime']):.2f} s")
+            self.updateStatus("Reconnected and ready", "blue")
+            return True
+        return False
+
     def disconnectFromDevice(self):
         """Disconnect from the current device"""
         if self.client:
@@ -770,19 +3857,29 @@ class BLEScanner:
             self.log(f"\nDisconnect error: {str(e)}")
         finally:
             self.client = None
-            self.readableCharacteristics.clear()
-            self.writableCharacteristics.clear()
-            self.notifiableCharacteristics.clear()
+            self.poller = None
+            self._release_adapter()
+            self.characteristics.clear()
             self.activeNotifications.clear()
             self.updateStatus("Disconnected", "orange")
             self.root.after(0, lambda: self.showAdvDataButton.config(state=tk.NORMAL))
             self.root.after(0, lambda: self.connectButton.config(state=tk.NORMAL))
             self.root.after(0, lambda: self.disconnectButton.config(state=tk.DISABLED))
             self.root.after(0, lambda: self.readCharButton.config(state=tk.DISABLED))
+            self.root.after(0, lambda: self.pollStartButton.config(state=tk.DISABLED))
+            self.root.after(0, lambda: self.pollStopButton.config(state=tk.DISABLED))
+            self.root.after(0, lambda: self.pollStatsButton.config(state=tk.DISABLED))
+            self.root.after(0, self._clear_gatt_tree)
             self.root.after(0, lambda: self.writeCharButton.config(state=tk.DISABLED))
             self.root.after(0, lambda: self.notifyCharEnableButton.config(state=tk.DISABLED))
             self.root.after(0, lambda: self.notifyCharDisableButton.config(state=tk.DISABLED))
 
+    def _release_adapter(self):
+        """Count the current connection as closed on its adapter (must be called from the BLE event loop)"""
+        if self.connectionAdapter:
+            self.adapterPool.release(self.connectionAdapter)
+            self.connectionAdapter = None
+
     def readCharacteristic(self):
         """Manually read a characteristic value"""
         if not self.client:
@@ -796,29 +3893,229 @@ class BLEScanner:
         
         # Schedule the read operation in the same event loop
         if self.loop and self.loop.is_running():
-            asyncio.run_coroutine_threadsafe(
-                self.readCharValue(uuid),
-                self.loop
-            )
+            self.submitOperation("read", uuid, self.readCharValue(uuid))
         else:
             messagebox.showerror("Error", "Event loop not available")
             
-    async def readCharValue(self, uuid):
+    def _populate_gatt_tree(self, serviceList):
+        """Fill the GATT tree with the discovered services (must be called from main thread)"""
+        self._clear_gatt_tree()
+        for service in serviceList:
+            serviceIid = f"svc:{service.handle}"
+            self.gattTree.insert(
+                "", tk.END, iid=serviceIid,
+                text=f"{shortUuid(service.uuid)}  {service.description}",
+                values=(service.handle, "", "")
+            )
+            for char in sorted(service.characteristics, key=lambda c: c.uuid):
+                charIid = f"char:{char.handle}"
+                self.treeItems[charIid] = char
+                self.gattTree.insert(
+                    serviceIid, tk.END, iid=charIid,
+                    text=f"{shortUuid(char.uuid)}  {char.description}",
+                    values=(char.handle, ", ".join(char.properties), "")
+                )
+                for desc in char.descriptors:
+                    descIid = f"desc:{desc.handle}"
+                    self.treeItems[descIid] = desc
+                    self.gattTree.insert(
+                        charIid, tk.END, iid=descIid,
+                        text=f"{shortUuid(desc.uuid)}  {desc.description}",
+                        values=(desc.handle, "", "")
+                    )
+        self.readAllButton.config(state=tk.NORMAL)
+
+    def _clear_gatt_tree(self):
+        """Remove all nodes from the GATT tree (must be called from main thread)"""
+        self.gattTree.delete(*self.gattTree.get_children())
+        self.treeItems = {}
+        self.treeRead = set()
+        self.readAllButton.config(state=tk.DISABLED)
+
+    def _set_gatt_tree_value(self, iid, text):
+        """Show a value in the GATT tree (must be called from main thread)"""
+        if self.gattTree.exists(iid):
+            self.gattTree.set(iid, "value", text)
+        self.treeRead.add(iid)
+
+    def _on_gatt_tree_open(self, event):
+        """Read the value and descriptors of an expanded characteristic"""
+        iid = self.gattTree.focus()
+        if iid.startswith("char:"):
+            self.readTreeNodes([iid] + list(self.gattTree.get_children(iid)))
+
+    def _on_gatt_tree_select(self, event):
+        """Read the selected node, and use its UUID in the read/write/notify frames"""
+        selection = self.gattTree.selection()
+        if not selection:
+            return
+        iid = selection[0]
+        if iid.startswith("char:"):
+            char = self.treeItems[iid]
+            for entry, props in (
+                (self.readCharUuidEntry, ("read",)),
+                (self.writeCharUuidEntry, ("write", "write-without-response")),
+                (self.notifyCharUuidEntry, ("notify", "indicate")),
+            ):
+                if any(p in char.properties for p in props):
+                    entry.delete(0, tk.END)
+                    entry.insert(0, self.characteristics.label(char))
+            self.readTreeNodes([iid] + list(self.gattTree.get_children(iid)))
+        elif iid.startswith("desc:"):
+            self.readTreeNodes([iid])
+
+    def readAllTreeValues(self):
+        """Read (again) every readable characteristic and descriptor of the GATT tree"""
+        self.treeRead = set()
+        self.readTreeNodes(list(self.treeItems))
+
+    def readTreeNodes(self, iids):
+        """Schedule the reading of the GATT tree nodes that haven't been read yet"""
+        iids = [iid for iid in iids if iid not in self.treeRead and iid in self.treeItems]
+        if not iids or not self.client or not (self.loop and self.loop.is_running()):
+            return
+        # Mark them right away, so that repeated clicks don't queue more reads
+        self.treeRead.update(iids)
+        asyncio.run_coroutine_threadsafe(self.readTreeValues(iids), self.loop)
+
+    async def readTreeValues(self, iids):
+        """Read the value of GATT tree nodes (characteristics and descriptors), one operation each"""
+        for iid in iids:
+            item = self.treeItems.get(iid)
+            try:
+                if iid.startswith("char:"):
+                    if "read" not in item.properties:
+                        continue
+                    value = await self.runOperation("read", self.characteristics.label(item), self.client.read_gatt_char(item))
+                    monoNs = time.monotonic_ns()
+                    decoder = characteristicDecoders.get(item.uuid)
+                    fields = decodeCharacteristic(decoder, value) if decoder else None
+                    self.recordEvent("read", self.deviceAddress, self.characteristics.label(item), value, fields, monoNs)
+                else:
+                    value = await self.runOperation(
+                        "read", f"descriptor {item.handle}", self.client.read_gatt_descriptor(item.handle)
+                    )
+                    fields = None
+                text = formatTreeValue(value, fields)
+            except asyncio.TimeoutError:
+                text = f"Read timed out after {self.opTimeout:g} s"
+            except Exception as e:
+                text = f"Read error: {str(e)}"
+            self.root.after(0, self._set_gatt_tree_value, iid, text)
+
+    def startCharPolling(self):
+        """Start polling a characteristic at the specified interval"""
+        if not self.client:
+            messagebox.showerror("Error", "Not connected to a device")
+            return
+
+        uuid = self.readCharUuidEntry.get().strip()
+        if not uuid:
+            messagebox.showerror("Error", "Please enter a characteristic UUID")
+            return
+
+        try:
+            interval = float(self.pollIntervalEntry.get().strip()) / 1000.0
+            if interval <= 0:
+                messagebox.showerror("Error", "Poll interval must be positive")
+                return
+        except ValueError:
+            messagebox.showerror("Error", "Invalid poll interval")
+            return
+
+        # Schedule the polling in the same event loop
+        if self.loop and self.loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.startPolling(uuid, interval), self.loop)
+        else:
+            messagebox.showerror("Error", "Event loop not available")
+
+    def stopCharPolling(self):
+        """Stop polling a characteristic"""
+        uuid = self.readCharUuidEntry.get().strip()
+        if not uuid:
+            messagebox.showerror("Error", "Please enter a characteristic UUID")
+            return
+
+        if self.loop and self.loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.stopPolling(uuid), self.loop)
+        else:
+            messagebox.showerror("Error", "Event loop not available")
+
+    def showPollStats(self):
+        """Log the requested vs achieved rate of every polled characteristic"""
+        if not self.poller or not self.poller.polls:
+            self.log("\nNo characteristics are being polled")
+            return
+        self.log("\nPolling statistics:")
+        for line in self.poller.stats():
+            self.log(f"  {line}")
+
+    async def startPolling(self, spec, interval):
+        """Add a characteristic to the read polling scheduler"""
+        try:
+            char = self.characteristics.resolve(spec, ("read",))
+        except ValueError as e:
+            self.log(f"\nError: {str(e)}")
+            return
+        if not self.poller:
+            return
+        label = self.characteristics.label(char)
+        self.poller.add(char.handle, label, interval)
+        self.log(f"\nPolling {label} every {interval * 1000:.0f} ms")
+        self.updateStatus("Polling started", "blue")
+
+    async def stopPolling(self, spec):
+        """Remove a characteristic from the read polling scheduler"""
+        try:
+            char = self.characteristics.resolve(spec)
+        except ValueError as e:
+            self.log(f"\nError: {str(e)}")
+            return
+        poll = self.poller.remove(char.handle) if self.poller else None
+        if poll is None:
+            self.log(f"\n{spec} is not being polled")
+            return
+        self.log(f"\nStopped polling {poll.label}: {poll.stats()}")
+        self.updateStatus("Polling stopped", "blue")
+
+    async def pollRead(self, handle):
+        """Read a polled characteristic, and log it as a single line"""
+        char = self.characteristics.byHandle[handle]
+        label = self.characteristics.label(char, short=True)
+        value = await self.runOperation("poll", label, self.client.read_gatt_char(char), quiet=True)
+        monoNs = time.monotonic_ns()
+        decoder = characteristicDecoders.get(char.uuid)
+        fields = decodeCharacteristic(decoder, value) if decoder else None
+        self.recordEvent("read", self.deviceAddress, self.characteristics.label(char), value, fields, monoNs)
+        if fields:
+            self.addPlotSamples(char, fields, monoNs)
+        timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3]
+        line = f"[{timestamp}] [POLL] {label}: {value.hex(' ')}"
+        if fields:
+            line += f"  ({formatDecodedFields(fields)})"
+        self.log(line)
+
+    async def readCharValue(self, spec):
         """Read a characteristic value"""
         try:
-            # Normalize UUID
-            normalizedUuid = self.normalizeUuid(uuid)
-            
-            # Check if this characteristic supports reading
-            if normalizedUuid not in self.readableCharacteristics:
-                self.log(f"\nError: Characteristic {uuid} does not support reading or not found")
-                return
+            # Look up the characteristic, and check that it supports reading
+            try:
+                char = self.characteristics.resolve(spec, ("read",))
+            except ValueError as e:
+                self.log(f"\nError: {str(e)}")
+                return False
             
             # Read the characteristic
-            self.log(f"\nReading characteristic {uuid}...")
+            self.log(f"\nReading characteristic {self.characteristics.label(char)}...")
             self.updateStatus("Reading...", "green")
             
-            value = await self.client.read_gatt_char(normalizedUuid)
+            value = await self.client.read_gatt_char(char)
+            monoNs = time.monotonic_ns()
+            decoder = characteristicDecoders.get(char.uuid)
+            fields = decodeCharacteristic(decoder, value) if decoder else None
+            self.recordEvent("read", self.deviceAddress, self.characteristics.label(char), value, fields, monoNs)
+            if fields:
+                self.addPlotSamples(char, fields, monoNs)
             
             # Format value as hex
             hex_value = " ".join(f"{b:02x}" for b in value)
@@ -846,13 +4143,18 @@ class BLEScanner:
                 uint32_be = int.from_bytes(value, byteorder='big')
                 self.log(f"  Value (uint32 LE): {uint32_le}")
                 self.log(f"  Value (uint32 BE): {uint32_be}")
+
+            if fields:
+                self.log(f"  Decoded: {formatDecodedFields(fields)}")
             
             self.log("Read successful!")
             self.updateStatus("Read complete", "blue")
+            return True
             
         except Exception as e:
             self.log(f"\nRead failed: {str(e)}")
             self.updateStatus(f"Read failed: {str(e)}", "red")
+            return False
             
     def writeCharacteristic(self):
         """Write a value to a characteristic"""
@@ -872,10 +4174,7 @@ class BLEScanner:
         
         # Schedule the write operation in the same event loop
         if self.loop and self.loop.is_running():
-            asyncio.run_coroutine_threadsafe(
-                self.writeCharValue(uuid, value_str, self.value_type.get()),
-                self.loop
-            )
+            self.submitOperation("write", uuid, self.writeCharValue(uuid, value_str, self.value_type.get()))
         else:
             messagebox.showerror("Error", "Event loop not available")
     
@@ -883,16 +4182,15 @@ class BLEScanner:
         """Deprecated - no longer used"""
         pass
             
-    async def writeCharValue(self, uuid, value_str, value_type):
+    async def writeCharValue(self, spec, value_str, value_type):
         """Write a value to a characteristic"""
         try:
-            # Normalize UUID
-            normalizedUuid = self.normalizeUuid(uuid)
-            
-            # Check if this is a writable characteristic
-            if normalizedUuid not in self.writableCharacteristics:
-                self.log(f"\nError: Characteristic {uuid} is not writable or not found")
-                return
+            # Look up the characteristic, and check that it is writable
+            try:
+                char = self.characteristics.resolve(spec, ("write", "write-without-response"))
+            except ValueError as e:
+                self.log(f"\nError: {str(e)}")
+                return False
                 
             # Parse the value based on type
             if value_type == "hex":
@@ -900,12 +4198,12 @@ class BLEScanner:
                 hex_str = value_str.replace(" ", "").replace("0x", "")
                 if len(hex_str) % 2 != 0:
                     self.log("\nError: Hex string must have even number of characters")
-                    return
+                    return False
                 try:
                     data = bytes.fromhex(hex_str)
                 except ValueError as e:
                     self.log(f"\nError: Invalid hex string: {e}")
-                    return
+                    return False
                     
             elif value_type == "dec":
                 # Parse decimal values (comma or space separated)
@@ -913,33 +4211,36 @@ class BLEScanner:
                     values = [int(v.strip()) for v in value_str.replace(",", " ").split()]
                     if any(v < 0 or v > 255 for v in values):
                         self.log("\nError: Decimal values must be between 0 and 255")
-                        return
+                        return False
                     data = bytes(values)
                 except ValueError as e:
                     self.log(f"\nError: Invalid decimal values: {e}")
-                    return
+                    return False
                     
             elif value_type == "string":
                 # Encode string as UTF-8
                 data = value_str.encode('utf-8')
             else:
                 self.log(f"\nError: Unknown value type: {value_type}")
-                return
+                return False
                 
             # Write to characteristic
-            self.log(f"\nWriting to characteristic {uuid}...")
+            self.log(f"\nWriting to characteristic {self.characteristics.label(char)}...")
             self.log(f"  Value type: {value_type}")
             self.log(f"  Bytes: {' '.join(f'{b:02x}' for b in data)}")
             self.updateStatus("Writing...", "green")
             
-            await self.client.write_gatt_char(normalizedUuid, data)
+            await self.client.write_gatt_char(char, data)
+            self.recordEvent("write", self.deviceAddress, self.characteristics.label(char), data, None, time.monotonic_ns())
             
             self.log("Write successful!")
             self.updateStatus("Write complete", "blue")
+            return True
             
         except Exception as e:
             self.log(f"\nWrite failed: {str(e)}")
             self.updateStatus(f"Write failed: {str(e)}", "red")
+            return False
             
     def enableCharNotifications(self):
         """Enable notifications/indications for a characteristic"""
@@ -952,12 +4253,18 @@ class BLEScanner:
             messagebox.showerror("Error", "Please enter a characteristic UUID")
             return
         
+        displayMode = NOTIFY_DISPLAY_MODES[self.notifyDisplayMode.get()]
+        try:
+            maxRate = float(self.notifyMaxRateEntry.get().strip())
+            if maxRate <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Max/s must be a positive number")
+            return
+        
         # Schedule the enable operation in the same event loop
         if self.loop and self.loop.is_running():
-            asyncio.run_coroutine_threadsafe(
-                self.startNotify(uuid),
-                self.loop
-            )
+            self.submitOperation("subscribe", uuid, self.startNotify(uuid, displayMode, maxRate))
         else:
             messagebox.showerror("Error", "Event loop not available")
             
@@ -974,130 +4281,857 @@ class BLEScanner:
         
         # Schedule the disable operation in the same event loop
         if self.loop and self.loop.is_running():
-            asyncio.run_coroutine_threadsafe(
-                self.stopNotify(uuid),
-                self.loop
-            )
+            self.submitOperation("unsubscribe", uuid, self.stopNotify(uuid))
         else:
             messagebox.showerror("Error", "Event loop not available")
             
-    async def startNotify(self, uuid):
-        """Start notifications/indications for a characteristic"""
+    async def startNotify(self, spec, displayMode="all", maxRate=2.0):
+        """Start notifications/indications for a characteristic
+
+        displayMode selects which packets are shown in the output log ("all",
+        "rate" for at most maxRate per second, "latest" for the subscriptions
+        table only, or "changes"). Every packet is still counted, recorded and
+        written to the log file.
+        """
         try:
-            # Normalize UUID
-            normalizedUuid = self.normalizeUuid(uuid)
-            
-            # Check if this characteristic supports notifications/indications
-            if normalizedUuid not in self.notifiableCharacteristics:
-                self.log(f"\nError: Characteristic {uuid} does not support notifications/indications")
-                return
+            # Look up the characteristic, and check that it supports notifications/indications
+            try:
+                char = self.characteristics.resolve(spec, ("notify", "indicate"))
+            except ValueError as e:
+                self.log(f"\nError: {str(e)}")
+                return False
+            label = self.characteristics.label(char)
             
             # Check if already subscribed
-            if normalizedUuid in self.activeNotifications:
-                self.log(f"\nNotifications already enabled for {uuid}")
-                return
+            if char.handle in self.activeNotifications:
+                self.log(f"\nNotifications already enabled for {label}")
+                return False
             
-            # Define notification callback
-            def notificationHandler(sender, data):
-                hex_value = " ".join(f"{b:02x}" for b in data)
-                timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3]
-                self.log(f"[{timestamp}] [NOTIFY] {uuid}: {hex_value}")
-                # Try to decode as string
-                try:
-                    str_value = data.decode('utf-8', errors='ignore')
-                    if str_value.isprintable():
-                        self.log(f"{' ' * (len(timestamp) + 2)}         String: {str_value}")
-                except:
-                    pass
+            # Register the subscription first, so that no notification sent right after enabling them is dropped
+            self.activeNotifications[char.handle] = NotificationSubscription(char, label, displayMode, maxRate)
             
             # Start notifications
-            self.log(f"\nEnabling notifications for {uuid}...")
-            await self.client.start_notify(normalizedUuid, notificationHandler)
-            self.activeNotifications[normalizedUuid] = True
+            self.log(f"\nEnabling notifications for {label}...")
+            try:
+                await self.client.start_notify(char, self.handleNotification)
+            except BaseException:
+                self.activeNotifications.pop(char.handle, None)
+                raise
             self.log("Notifications enabled!")
             self.updateStatus("Notifications enabled", "blue")
+            return True
             
         except Exception as e:
             self.log(f"\nFailed to enable notifications: {str(e)}")
             self.updateStatus(f"Notification error: {str(e)}", "red")
+            return False
+
+    def handleNotification(self, sender, data):
+        """Handle a notification/indication, routed to its subscription by ATT handle"""
+        monoNs = time.monotonic_ns()
+        # Depending on the bleak version and backend, the sender is the characteristic or its handle
+        subscription = self.activeNotifications.get(getattr(sender, "handle", sender))
+        if subscription is None:
+            return
+        char = subscription.char
+        decoder = subscription.decoder
+        fields = decodeCharacteristic(decoder, data) if decoder else None
+        self.recordEvent("notify", self.deviceAddress, subscription.label, data, fields, monoNs)
+        # Evaluate the rules first, so that their actions are started as soon as possible
+        ruleEngine = self.ruleEngine
+        if ruleEngine:
+            for rule in ruleEngine.evaluate(char.handle, data, fields, monoNs):
+                self.runRuleActions(rule, char, data, monoNs)
+        if fields:
+            self.addPlotSamples(char, fields, monoNs)
+        first = subscription.firstNs is None
+        display = subscription.update(data, fields, monoNs)
+        if first:
+            self.log(f"First notification from {subscription.label} "
+                     f"{(monoNs - subscription.requestNs) / 1e6:.0f} ms after the subscription request")
+        if not display and not self.logWriter:
+            return
+        hex_value = " ".join(f"{b:02x}" for b in data)
+        timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3]
+        self.log(f"[{timestamp}] [NOTIFY] {subscription.label}: {hex_value}", display)
+        # Try to decode as string
+        try:
+            str_value = data.decode('utf-8', errors='ignore')
+            if str_value.isprintable():
+                self.log(f"{' ' * (len(timestamp) + 2)}         String: {str_value}", display)
+        except:
+            pass
+        if fields:
+            self.log(f"{' ' * (len(timestamp) + 2)}         Decoded: {formatDecodedFields(fields)}", display)
             
-    async def stopNotify(self, uuid):
+    async def stopNotify(self, spec):
         """Stop notifications/indications for a characteristic"""
         try:
-            # Normalize UUID
-            normalizedUuid = self.normalizeUuid(uuid)
-            
             # Check if notifications are active
-            if normalizedUuid not in self.activeNotifications:
-                self.log(f"\nNo active notifications for {uuid}")
-                return
+            try:
+                char = self.characteristics.resolve(spec)
+            except ValueError as e:
+                self.log(f"\nError: {str(e)}")
+                return False
+            subscription = self.activeNotifications.get(char.handle)
+            if subscription is None:
+                self.log(f"\nNo active notifications for {spec}")
+                return False
             
             # Stop notifications
-            self.log(f"\nDisabling notifications for {uuid}...")
-            await self.client.stop_notify(normalizedUuid)
-            del self.activeNotifications[normalizedUuid]
+            self.log(f"\nDisabling notifications for {subscription.label}...")
+            await self.client.stop_notify(char)
+            del self.activeNotifications[char.handle]
             self.log("Notifications disabled!")
             self.updateStatus("Notifications disabled", "blue")
+            return True
             
         except Exception as e:
             self.log(f"\nFailed to disable notifications: {str(e)}")
             self.updateStatus(f"Notification error: {str(e)}", "red")
+            return False
             
-    def normalizeUuid(self, uuid):
-        """Normalize UUID to full 128-bit format with lowercase"""
-        # Remove spaces and dashes
-        uuidClean = uuid.replace("-", "").replace(" ", "").lower()
-        
-        # Check length
-        if len(uuidClean) == 4:
-            # 16-bit UUID - convert to 128-bit
-            return f"0000{uuidClean}-0000-1000-8000-00805f9b34fb"
-        elif len(uuidClean) == 32:
-            # 128-bit UUID - format with dashes
-            return f"{uuidClean[0:8]}-{uuidClean[8:12]}-{uuidClean[12:16]}-{uuidClean[16:20]}-{uuidClean[20:32]}"
+    def runRuleActions(self, rule, char, data, monoNs):
+        """Start the actions of a triggered rule (called from the notification handler, in the BLE event loop)"""
+        for action in rule.actions:
+            do = action["do"]
+            if do == "write":
+                coroutine = self.writeCharValue(action["char"], action["hex"], "hex")
+            elif do == "subscribe":
+                coroutine = self.startNotify(action["char"])
+            elif do == "unsubscribe":
+                coroutine = self.stopNotify(action["char"])
+            else:
+                coroutine = None
+                if do == "mark":
+                    self.recordEvent("mark", self.deviceAddress, self.characteristics.label(char), data,
+                                     {"rule": rule.name, "label": action.get("label", rule.name)}, monoNs)
+                elif do == "start_capture":
+                    self.capturing = True
+                elif do == "stop_capture":
+                    self.capturing = False
+            if coroutine:
+                task = asyncio.ensure_future(self.runOperation(do, f"{action['char']} (rule {rule.name})", coroutine))
+                # Failures are already logged by the operation
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3]
+        self.log(f"[{timestamp}] [RULE] {rule.name}: {', '.join(a['do'] for a in rule.actions) or 'no action'}")
+
+    def loadRulesFile(self):
+        """Load (or replace) the notification rules from a JSON file"""
+        path = filedialog.askopenfilename(
+            title="Load Rules",
+            filetypes=[("JSON", "*.json"), ("All files", "*")]
+        )
+        if not path:
+            return
+        try:
+            ruleEngine = RuleEngine(loadRules(path))
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not load rules: {str(e)}")
+            return
+        if self.client:
+            for error in ruleEngine.bind(self.characteristics):
+                self.log(f"Rule disabled for this device - {error}")
+        self.ruleEngine = ruleEngine
+        self.log(f"\nLoaded {len(ruleEngine.rules)} rule(s) from {path}")
+
+    def showRuleStats(self):
+        """Log the hit count and evaluation cost of every rule"""
+        if not self.ruleEngine:
+            self.log("\nNo rules loaded")
+            return
+        self.log("\nRule statistics:")
+        for rule in self.ruleEngine.rules:
+            self.log(f"  {rule.name}: {rule.stats()}")
+
+    def _refresh_notify_table(self):
+        """Update the subscriptions table with the latest counters and values (must be called from main thread)"""
+        self.root.after(NOTIFY_TABLE_INTERVAL_MS, self._refresh_notify_table)
+        subscriptions = {str(handle): subscription for handle, subscription in dict(self.activeNotifications).items()}
+        for iid in self.notifyTable.get_children():
+            if iid not in subscriptions:
+                self.notifyTable.delete(iid)
+        for iid, subscription in subscriptions.items():
+            row = subscription.tableRow()
+            if self.notifyTable.exists(iid):
+                self.notifyTable.item(iid, values=row)
+            else:
+                self.notifyTable.insert("", tk.END, iid=iid, text=subscription.label, values=row)
+
+    def handleRemoteCommand(self, command):
+        """Schedule a command sent by an event subscriber (called from the publisher thread)
+
+        Supported commands are {"cmd": "read" | "subscribe" | "unsubscribe", "char": SPEC}
+        and {"cmd": "write", "char": SPEC, "hex": VALUE}, where SPEC is "UUID", "UUID#N"
+        or "@HANDLE". Results are published as regular session events.
+        """
+        if not self.client or not (self.loop and self.loop.is_running()):
+            raise RuntimeError("Not connected to a device")
+        cmd = command.get("cmd")
+        uuid = command.get("char")
+        if not uuid:
+            raise ValueError("Missing characteristic ('char')")
+        if cmd == "read":
+            coroutine = self.readCharValue(uuid)
+        elif cmd == "write":
+            coroutine = self.writeCharValue(uuid, command.get("hex", ""), "hex")
+        elif cmd == "subscribe":
+            coroutine = self.startNotify(uuid)
+        elif cmd == "unsubscribe":
+            coroutine = self.stopNotify(uuid)
         else:
-            # Return as-is and let it fail with proper error message
-            return uuid.lower()
-            
+            raise ValueError(f"Unknown command: {cmd}")
+        self.submitOperation(cmd, uuid, coroutine)
+        return "scheduled"
+
+    def submitOperation(self, kind, label, coroutine):
+        """Schedule a BLE operation on the event loop, with a timeout and tracked as in-flight (thread-safe)"""
+        return asyncio.run_coroutine_threadsafe(self.runOperation(kind, label, coroutine), self.loop)
+
+    async def runOperation(self, kind, label, coroutine, quiet=False):
+        """Run a BLE operation with the configured timeout, and record its outcome and latency
+
+        The operation runs in its own task so that it can be cancelled on its
+        own (raising OperationCancelled in the caller). The coroutine returns
+        False when it failed and already reported why; timeouts, cancellations
+        and exceptions are recorded and re-raised. Timeouts of quiet operations
+        (polls, whose poller counts the errors) aren't logged.
+        """
+        self.operationCount += 1
+        opId = self.operationCount
+        start = time.monotonic()
+        task = asyncio.ensure_future(coroutine)
+        self.inflightOps[opId] = (kind, label, start, task)
+        stats = self.operationStats.setdefault(kind, OperationStats())
+        try:
+            result = await asyncio.wait_for(task, self.opTimeout)
+        except asyncio.TimeoutError:
+            stats.record("timeout", time.monotonic() - start)
+            if not quiet:
+                self.log(f"\n{kind.capitalize()} {label} timed out after {self.opTimeout:g} s")
+                self.updateStatus(f"{kind.capitalize()} timed out", "red")
+            raise
+        except asyncio.CancelledError:
+            stats.record("cancelled", time.monotonic() - start)
+            if opId not in self.cancelledOps:
+                raise
+            self.cancelledOps.discard(opId)
+            self.log(f"\n{kind.capitalize()} {label} cancelled")
+            self.updateStatus(f"{kind.capitalize()} cancelled", "red")
+            raise OperationCancelled(f"{kind} {label} cancelled") from None
+        except Exception:
+            stats.record("error", time.monotonic() - start)
+            raise
+        finally:
+            self.inflightOps.pop(opId, None)
+        stats.record("error" if result is False else "ok", time.monotonic() - start)
+        return result
+
+    def cancelSelectedOperations(self):
+        """Cancel the operations selected in the in-flight operations table"""
+        for iid in self.opsTable.selection():
+            self._cancel_operation(int(iid))
+
+    def cancelAllOperations(self):
+        """Cancel all the in-flight operations, polls included"""
+        for opId in list(self.inflightOps):
+            self._cancel_operation(opId)
+
+    def _cancel_operation(self, opId):
+        """Cancel an in-flight operation (must be called from main thread)"""
+        op = self.inflightOps.get(opId)
+        if op and self.loop and self.loop.is_running():
+            self.cancelledOps.add(opId)
+            self.loop.call_soon_threadsafe(op[3].cancel)
+
+    def showOperationStats(self):
+        """Log the outcome counters and latency of each type of operation"""
+        if not self.operationStats:
+            self.log("\nNo operations yet")
+            return
+        self.log(f"\nOperation statistics (timeout {self.opTimeout:g} s):")
+        for kind, stats in sorted(self.operationStats.items()):
+            self.log(f"  {kind}: {stats.summary()}")
+
+    def _refresh_ops_table(self):
+        """Update the in-flight operations table and their elapsed time (must be called from main thread)"""
+        self.root.after(OP_TABLE_INTERVAL_MS, self._refresh_ops_table)
+        ops = dict(self.inflightOps)
+        now = time.monotonic()
+        for iid in self.opsTable.get_children():
+            if int(iid) not in ops:
+                self.opsTable.delete(iid)
+        for opId, (kind, label, start, task) in ops.items():
+            row = (kind, label, f"{now - start:.1f}")
+            if self.opsTable.exists(str(opId)):
+                self.opsTable.item(str(opId), values=row)
+            else:
+                self.opsTable.insert("", tk.END, iid=str(opId), values=row)
+
+    def searchEvents(self):
+        """Search the session events matching the search bar fields"""
+        startNs = self.eventIndex.startNs()
+        if not self.eventIndex.capacity:
+            self.searchStatusLabel.config(text="Session search disabled (--search-index-size 0)")
+            return
+        if startNs is None:
+            self.searchStatusLabel.config(text="No events yet")
+            return
+        kind = self.searchKind.get()
+        try:
+            start = self.searchFromEntry.get().strip()
+            start = startNs + int(float(start) * 1e9) if start else None
+            end = self.searchToEntry.get().strip()
+            end = startNs + int(float(end) * 1e9) if end else None
+        except ValueError:
+            messagebox.showerror("Error", "Invalid time range")
+            return
+        payload = self.searchPayloadEntry.get().strip()
+        try:
+            payload = parsePayloadPattern(payload) if payload else None
+        except (ValueError, re.error) as e:
+            messagebox.showerror("Error", f"Invalid payload pattern: {str(e)}")
+            return
+
+        queryStart = time.perf_counter()
+        self.searchResults, total = self.eventIndex.search(
+            kind=None if kind == "any" else kind,
+            device=self.searchDeviceEntry.get().strip() or None,
+            char=self.searchCharEntry.get().strip() or None,
+            start=start,
+            end=end,
+            payload=payload
+        )
+        elapsed = time.perf_counter() - queryStart
+        if total is None:
+            matches = f"more than {len(self.searchResults)} matches (first {len(self.searchResults)} shown)"
+        elif total > len(self.searchResults):
+            matches = f"{total} matches (first {len(self.searchResults)} shown)"
+        else:
+            matches = f"{total} match(es)"
+        self.searchStatusLabel.config(
+            text=f"{matches} among the last {len(self.eventIndex)} events, in {elapsed * 1000:.1f} ms"
+        )
+        self._show_search_events(self.searchResults)
+
+    def _show_search_events(self, eventIds, focus=None):
+        """Fill the search results table with events (must be called from main thread)"""
+        self.searchTable.delete(*self.searchTable.get_children())
+        startNs = self.eventIndex.startNs()
+        for eventId in eventIds:
+            event = self.eventIndex.get(eventId)
+            if event is None:
+                # Dropped from the index since the search
+                continue
+            monoNs, _, kind, device, char, data, fields = event
+            dataHex = data.hex(" ")
+            self.searchTable.insert("", tk.END, iid=str(eventId), values=(
+                f"{(monoNs - startNs) / 1e9:.3f}",
+                kind,
+                device or "",
+                shortUuid(char) if char else "",
+                dataHex if len(dataHex) <= 96 else dataHex[:93] + "...",
+                formatDecodedFields(fields) if fields else "",
+            ))
+        if focus is not None and self.searchTable.exists(str(focus)):
+            self.searchTable.selection_set(str(focus))
+            self.searchTable.see(str(focus))
+        self.searchResultsButton.config(state=tk.NORMAL if focus is not None else tk.DISABLED)
+
+    def _on_search_result_open(self, event):
+        """Show the events recorded around the double-clicked result (must be called from main thread)"""
+        selection = self.searchTable.selection()
+        if not selection:
+            return
+        eventId = int(selection[0])
+        first = max(self.eventIndex.firstId, eventId - SEARCH_CONTEXT_EVENTS)
+        last = min(self.eventIndex.nextId, eventId + SEARCH_CONTEXT_EVENTS + 1)
+        self._show_search_events(range(first, last), focus=eventId)
+
+    def addPlotSamples(self, char, fields, monoNs):
+        """Append the numeric decoded fields of a characteristic value to their chart series"""
+        t = monoNs / 1e9
+        label = self.characteristics.label(char, short=True)
+        for field, value in fields.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            key = f"{label} {field}"
+            series = self.plotSeries.get(key)
+            if series is None:
+                series = self.plotSeries[key] = PlotSeries()
+                self.root.after(0, self._update_chart_fields)
+            series.append(t, value)
+
+    def _update_chart_fields(self):
+        """Refresh the list of chartable fields (must be called from main thread)"""
+        listed = set(self.chartFieldsListbox.get(0, tk.END))
+        for key in sorted(self.plotSeries):
+            if key not in listed:
+                self.chartFieldsListbox.insert(tk.END, key)
+
+    def _redraw_chart(self):
+        """Redraw the live chart from the decimated series (must be called from main thread)"""
+        self.root.after(PLOT_FRAME_INTERVAL_MS, self._redraw_chart)
+        canvas = self.chartCanvas
+        width = canvas.winfo_width()
+        height = canvas.winfo_height()
+        try:
+            window = float(self.chartWindowEntry.get())
+        except ValueError:
+            return
+        if width < 20 or height < 20 or window <= 0:
+            return
+
+        selected = [self.chartFieldsListbox.get(i) for i in self.chartFieldsListbox.curselection()]
+        for key in list(self.plotLines):
+            if key not in selected:
+                for item in self.plotLines.pop(key):
+                    canvas.delete(item)
+
+        now = time.monotonic()
+        bucketSpan = window / width
+        for index, key in enumerate(selected):
+            series = self.plotSeries[key]
+            if series.bucketCount != width or series.bucketSpan != bucketSpan:
+                series.setResolution(bucketSpan, width)
+            columns = series.columns(now)
+            color = PLOT_COLORS[index % len(PLOT_COLORS)]
+            if key not in self.plotLines:
+                self.plotLines[key] = (
+                    canvas.create_line(0, 0, 0, 0, fill=color),
+                    canvas.create_text(5, 0, anchor=tk.NW, fill=color, font=("Consolas", self.textFontSize)),
+                )
+            line, legend = self.plotLines[key]
+
+            # Each series is scaled to its own range over the window
+            if columns:
+                low = min(c[1] for c in columns)
+                high = max(c[2] for c in columns)
+            else:
+                low = high = 0.0
+            scale = (height - 10) / (high - low) if high > low else 0.0
+            points = []
+            for column, columnMin, columnMax in columns:
+                points.extend((column, height - 5 - (columnMax - low) * scale))
+                points.extend((column, height - 5 - (columnMin - low) * scale))
+            if len(points) >= 4:
+                canvas.coords(line, *points)
+            else:
+                canvas.coords(line, 0, 0, 0, 0)
+            canvas.coords(legend, 5, 5 + index * (self.textFontSize + 8))
+            canvas.itemconfig(legend, text=f"{key}: {series.last:g} [{low:g} .. {high:g}]")
+
+    def exportSession(self):
+        """Export the captured session events to a file"""
+        outputPath = filedialog.asksaveasfilename(
+            title="Export Session",
+            defaultextension=".csv",
+            filetypes=[
+                ("CSV", "*.csv"),
+                ("JSON Lines", "*.jsonl"),
+                ("NumPy archive", "*.npz"),
+                ("Parquet", "*.parquet"),
+                ("Arrow IPC", "*.arrow"),
+            ]
+        )
+        if not outputPath:
+            return
+        if os.path.splitext(outputPath)[1].lower() not in EXPORT_FORMATS:
+            messagebox.showerror("Error", "Unsupported export file type")
+            return
+
+        # Export in a separate thread, as large sessions can take a while
+        thread = threading.Thread(target=self.runExport, args=(outputPath,), daemon=True)
+        thread.start()
+
+    def runExport(self, outputPath):
+        """Flush the session capture and export it"""
+        try:
+            self.capture.flush()
+            self.updateStatus("Exporting...", "green")
+            count = exportCapture(
+                self.capture.path,
+                outputPath,
+                progress=lambda n: self.updateStatus(f"Exporting... {n} events", "green")
+            )
+            self.log(f"\nExported {count} event(s) to {outputPath}")
+            self.updateStatus("Export complete", "blue")
+        except Exception as e:
+            self.log(f"\nExport failed: {str(e)}")
+            self.updateStatus(f"Export failed: {str(e)}", "red")
+
+async def sweep(args):
+    """Sweep the devices given by --sweep-addresses, or found by a scan, and return the exit code"""
+    scanDuration = float(args.scan_duration)
+    adapterPool = None
+    if args.adapters:
+        adapterPool = AdapterPool(adapter.strip() for adapter in args.adapters.split(",") if adapter.strip())
+    if args.sweep_addresses:
+        targets = [address.strip() for address in args.sweep_addresses.split(",") if address.strip()]
+    else:
+        print(f"Scanning for {scanDuration:g} seconds...")
+        targets = await scanMatchingDevices(args.svc_uuid, args.dev_name_prefix, scanDuration, adapterPool)
+        print(f"Found {len(targets)} matching device(s)")
+    if not targets:
+        return 1
+    succeeded = await runSweep(
+        targets,
+        args.sweep,
+        concurrency=args.sweep_concurrency,
+        retries=args.sweep_retries,
+        opTimeout=args.op_timeout,
+        scanTimeout=scanDuration,
+        adapterPool=adapterPool
+    )
+    return 0 if succeeded == len(targets) else 1
+
 def main():
     # Parse command-line arguments
     parser = argparse.ArgumentParser(description="BLE Device Explorer - Scan and connect to Bluetooth Low Energy devices")
+    parser.add_argument(
+        '--adapters',
+        type=str,
+        default=None,
+        help="Comma-separated Bluetooth adapters to scan on simultaneously and to place connections on (e.g. hci0,hci1)"
+    )
+    parser.add_argument(
+        '--adv-format',
+        type=str,
+        default=None,
+        help="Decoded advertisement format to match (e.g. iBeacon, Eddystone)"
+    )
+    parser.add_argument(
+        '--adv-parsers',
+        type=str,
+        action='append',
+        default=None,
+        help="Python file defining MANUFACTURER_PARSERS and/or SERVICE_DATA_PARSERS for vendor formats (can be repeated)"
+    )
+    parser.add_argument(
+        '--auto-reconnect',
+        action='store_true',
+        help="Automatically reconnect and restore the notifications when the link drops"
+    )
     parser.add_argument(
         '--auto-scan',
         action='store_true',
         help="Enable auto scan upon start up"
     )
+    parser.add_argument(
+        '--capture-file',
+        type=str,
+        default=None,
+        help="Optional file where to spool all session events for export (default: temporary file)"
+    )
+    parser.add_argument(
+        '--char-decoders',
+        type=str,
+        action='append',
+        default=None,
+        help="Python file defining CHARACTERISTIC_DECODERS for vendor characteristic values (can be repeated)"
+    )
+    parser.add_argument(
+        '--connect',
+        type=str,
+        default=None,
+        metavar='ADDRESS',
+        help="Connect directly to the device with this address upon start up (no full scan needed)"
+    )
     parser.add_argument(
         '--dev-name-prefix',
         type=str,
         default=None,
         help="Device name prefix to match"
     )
+    parser.add_argument(
+        '--export',
+        type=str,
+        nargs=2,
+        default=None,
+        metavar=('CAPTURE_FILE', 'OUTPUT_FILE'),
+        help="Export a capture file to CSV, JSON Lines, .npz, Parquet or Arrow (by file extension) and exit"
+    )
+    parser.add_argument(
+        '--export-format',
+        type=str,
+        choices=sorted(set(EXPORT_FORMATS.values())),
+        default=None,
+        help="Export format, when it can't be inferred from the output file extension"
+    )
+    parser.add_argument(
+        '--lazy-explore',
+        action='store_true',
+        help="Don't read all the characteristics upon connection: read them on demand from the GATT tree"
+    )
+    parser.add_argument(
+        '--log-adv-changes',
+        action='store_true',
+        help="Log a diff line whenever the advertisement content of a found device changes"
+    )
     parser.add_argument(
         '--log-file',
         type=str,
         default=None,
         help="Optional log file where to save all output (appends to existing file)"
-    ) 
+    )
+    parser.add_argument(
+        '--merge',
+        type=str,
+        nargs='+',
+        default=None,
+        metavar='CAPTURE_FILE',
+        help="Merge capture files (recorded on this computer) into one time-ordered stream, and exit"
+    )
+    parser.add_argument(
+        '--merge-live',
+        type=str,
+        nargs='+',
+        default=None,
+        metavar='ENDPOINT',
+        help="Merge the live events of several publish endpoints (in jsonl format) into one time-ordered stream"
+    )
+    parser.add_argument(
+        '--merge-output',
+        type=str,
+        default="-",
+        metavar='OUTPUT_FILE',
+        help="Output file of the merged stream, in capture (JSON lines) format (default: standard output)"
+    )
+    parser.add_argument(
+        '--merge-window',
+        type=float,
+        default=MERGE_REORDER_WINDOW,
+        help=f"Reorder window of the merge, and delay of the live merge (default: {MERGE_REORDER_WINDOW:g} seconds)"
+    )
+    parser.add_argument(
+        '--op-timeout',
+        type=float,
+        default=10.0,
+        help="Timeout of each read, write, subscribe and unsubscribe operation (default: 10 seconds)"
+    )
+    parser.add_argument(
+        '--passive-scan',
+        action='store_true',
+        help="Use passive scanning (no scan requests) where supported by the platform"
+    )
+    parser.add_argument(
+        '--publish',
+        type=str,
+        default=None,
+        metavar='ENDPOINT',
+        help="Stream session events to local subscribers on unix:PATH or tcp:[HOST:]PORT"
+    )
+    parser.add_argument(
+        '--publish-format',
+        type=str,
+        choices=["jsonl", "binary"],
+        default="jsonl",
+        help="Format of the published events: JSON lines or length-prefixed binary frames (default: jsonl)"
+    )
+    parser.add_argument(
+        '--publish-queue',
+        type=int,
+        default=1024,
+        help="Maximum number of events queued per subscriber before dropping the oldest (default: 1024)"
+    )
+    parser.add_argument(
+        '--publish-remote',
+        action='store_true',
+        help="Accept a non-loopback --publish TCP host (subscribers can send unauthenticated write commands)"
+    )
+    parser.add_argument(
+        '--registry',
+        type=str,
+        default=None,
+        metavar='REGISTRY_FILE',
+        help="SQLite file recording every device seen by the scans, across sessions"
+    )
+    parser.add_argument(
+        '--registry-name',
+        type=str,
+        default=None,
+        metavar='NAME_PREFIX',
+        help="Print the devices of --registry whose name starts with NAME_PREFIX (\"\" for all of them), and exit"
+    )
+    parser.add_argument(
+        '--registry-service',
+        type=str,
+        default=None,
+        metavar='UUID',
+        help="Print the devices of --registry that advertised the service UUID, and exit"
+    )
+    parser.add_argument(
+        '--rules',
+        type=str,
+        default=None,
+        help="JSON file of rules evaluated on every notification, triggering writes, subscriptions, marks, etc."
+    )
     parser.add_argument(
         '--scan-duration',
         type=str,
         default="5",
         help="Duration of the device scan (default: 5 seconds)"
     )       
+    parser.add_argument(
+        '--scan-stop-count',
+        type=int,
+        default=None,
+        help="Stop the scan as soon as this many matching devices have been found"
+    )
+    parser.add_argument(
+        '--scan-stop-on',
+        type=str,
+        default=None,
+        metavar='ADDRESS_OR_NAME',
+        help="Stop the scan as soon as the device with this address or name has been found"
+    )
+    parser.add_argument(
+        '--search-index-size',
+        type=int,
+        default=SEARCH_INDEX_SIZE,
+        help=f"Number of most recent events kept in memory for the session search (default: {SEARCH_INDEX_SIZE}, 0 disables it)"
+    )
     parser.add_argument(
         '--svc-uuid',
         type=str,
         default=None,
         help="Advertised Service UUID to match"
     )
+    parser.add_argument(
+        '--sweep',
+        type=str,
+        default=None,
+        metavar='OUTPUT_FILE',
+        help="Sweep the GATT table of many devices (headless), writing one JSON record per device to OUTPUT_FILE"
+    )
+    parser.add_argument(
+        '--sweep-addresses',
+        type=str,
+        default=None,
+        metavar='ADDRESSES',
+        help="Comma-separated addresses of the devices to sweep (default: the devices found by a scan)"
+    )
+    parser.add_argument(
+        '--sweep-concurrency',
+        type=int,
+        default=4,
+        help="Maximum number of devices swept at the same time (default: 4)"
+    )
+    parser.add_argument(
+        '--sweep-retries',
+        type=int,
+        default=2,
+        help="Number of retries of a device whose sweep failed (default: 2)"
+    )
     parser.add_argument(
         '--text-font-size',
         type=str,
         default="10",
         help="Font size used for the text output (default: 10 points)"
     )
+    parser.add_argument(
+        '--throughput',
+        type=str,
+        default=None,
+        metavar='ADDRESS',
+        help="Run a throughput test (headless) with the device at ADDRESS"
+    )
+    parser.add_argument(
+        '--throughput-bytes',
+        type=int,
+        default=None,
+        help="End the throughput test once this many bytes have been received/sent"
+    )
+    parser.add_argument(
+        '--throughput-duration',
+        type=float,
+        default=10.0,
+        help="Duration of the throughput test (default: 10 seconds)"
+    )
+    parser.add_argument(
+        '--throughput-notify',
+        type=str,
+        default=None,
+        metavar='CHARACTERISTIC',
+        help="Characteristic (UUID, UUID#N or @HANDLE) whose notification throughput is measured"
+    )
+    parser.add_argument(
+        '--throughput-output',
+        type=str,
+        default=None,
+        help="File where to append the results of the throughput test, as one JSON line per run"
+    )
+    parser.add_argument(
+        '--throughput-payload',
+        type=int,
+        default=None,
+        help="Size of the payloads written by the throughput test (default: the largest allowed by the MTU)"
+    )
+    parser.add_argument(
+        '--throughput-seq',
+        type=str,
+        default=None,
+        metavar='FORMAT[@OFFSET]',
+        help="Packet counter carried by the notifications, as a struct format and offset (e.g. '<H' or '>I@2')"
+    )
+    parser.add_argument(
+        '--throughput-write',
+        type=str,
+        default=None,
+        metavar='CHARACTERISTIC',
+        help="Characteristic (UUID, UUID#N or @HANDLE) whose write-without-response throughput is measured"
+    )
     args = parser.parse_args()
+
+    # Headless export of a capture file
+    if args.export:
+        capturePath, outputPath = args.export
+        try:
+            count = exportCapture(capturePath, outputPath, args.export_format)
+        except Exception as e:
+            print(f"Export failed: {e}")
+            return 1
+        print(f"Exported {count} event(s) to {outputPath}")
+        return 0
+
+    # Headless time-ordered merge of capture files, or of live event streams
+    if args.merge or args.merge_live:
+        try:
+            if args.merge:
+                count, late = mergeCaptures(args.merge, args.merge_output, args.merge_window)
+            else:
+                count, late = asyncio.run(mergeLive(args.merge_live, args.merge_output, args.merge_window))
+        except KeyboardInterrupt:
+            return 0
+        except Exception as e:
+            print(f"Merge failed: {e}", file=sys.stderr)
+            return 1
+        print(f"Merged {count} event(s)" + (f", {late} late event(s) out of order" if late else ""), file=sys.stderr)
+        return 0
+
+    # Headless lookup of the devices recorded by the registry
+    if args.registry_name is not None or args.registry_service is not None:
+        if not args.registry or not os.path.exists(args.registry):
+            print("A device registry file must be given with --registry", file=sys.stderr)
+            return 1
+        try:
+            devices = lookupDevices(args.registry, args.registry_name, args.registry_service)
+        except sqlite3.Error as e:
+            print(f"Lookup failed: {e}", file=sys.stderr)
+            return 1
+        for device in devices:
+            print(formatKnownDevice(device))
+        print(f"{len(devices)} known device(s)")
+        return 0
+
+    # Headless GATT sweep of many devices
+    if args.sweep:
+        return asyncio.run(sweep(args))
+
+    # Headless throughput test
+    if args.throughput:
+        return asyncio.run(throughputTest(args))
     
     root = tk.Tk()
     #root.option_add('*Font', 'System 10')
@@ -1116,12 +5150,23 @@ def main():
                 except Exception as e:
                     print(f"Error during disconnect: {e}")
         
-        # Close log file      
-        if app.logFileHandle:
-            app._write_to_log_file(f"\n{'='*80}\n")
-            app._write_to_log_file(f"Session ended at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            app._write_to_log_file(f"{'='*80}\n\n")
-            app.logFileHandle.close()
+        # Close log file (the lines still queued are written first)
+        if app.logWriter:
+            app.logWriter.write(f"\n{'='*80}\n")
+            app.logWriter.write(f"Session ended at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            app.logWriter.write(f"{'='*80}\n\n")
+            app.logWriter.close()
+
+        # Close the publish endpoint
+        if app.publisher:
+            app.publisher.close()
+
+        # Write the last sightings to the device registry
+        if app.registry:
+            app.registry.close()
+
+        # Close the session capture (temporary captures are discarded)
+        app.capture.close(remove=app.capture.temporary)
             
         root.destroy()
     
@@ -1129,5 +5174,5 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
 
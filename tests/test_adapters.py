@@ -0,0 +1,150 @@
+"""Multi-adapter scanning and connection placement, with stand-ins for the bleak backend"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("bleak")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bleExp  # noqa: E402
+
+
+class FakeDevice:
+    def __init__(self, address, name=None, adapter=None):
+        self.address = address
+        self.name = name
+        self.adapter = adapter
+
+
+class FakeAdvertisement:
+    def __init__(self, rssi, service_uuids=()):
+        self.rssi = rssi
+        self.service_uuids = list(service_uuids)
+        self.service_data = {}
+        self.manufacturer_data = {}
+        self.local_name = None
+
+
+class FakeScanner:
+    """Scanner stand-in replaying the advertisements scripted for its adapter"""
+    scripts = {}
+    failing = set()
+
+    def __init__(self, detection_callback=None, adapter=None, **kwargs):
+        self.callback = detection_callback
+        self.adapter = adapter
+
+    async def start(self):
+        if self.adapter in self.failing:
+            raise OSError(f"{self.adapter} not found")
+        for address, rssi in self.scripts.get(self.adapter, []):
+            self.callback(FakeDevice(address, "Dev", self.adapter), FakeAdvertisement(rssi))
+
+    async def stop(self):
+        pass
+
+    @classmethod
+    async def find_device_by_address(cls, address, timeout=10.0, adapter=None, **kwargs):
+        return FakeDevice(address, "Found", adapter)
+
+
+class FakeClient:
+    """Client stand-in of a device without services"""
+    instances = []
+
+    def __init__(self, device, adapter=None, **kwargs):
+        self.device = device
+        self.adapter = adapter
+        self.services = []
+        self.mtu_size = 23
+        FakeClient.instances.append(self)
+
+    async def connect(self, **kwargs):
+        await asyncio.sleep(0.01)
+
+    async def disconnect(self):
+        pass
+
+
+@pytest.fixture
+def pool():
+    FakeScanner.scripts = {
+        "hci0": [("AA:01", -80), ("AA:02", -50), ("AA:01", -81)],
+        "hci1": [("AA:01", -60), ("AA:03", -70)],
+    }
+    FakeScanner.failing = {"hci2"}
+    FakeClient.instances = []
+    return bleExp.AdapterPool(["hci0", "hci1", "hci2"], scannerFactory=FakeScanner, clientFactory=FakeClient)
+
+
+def test_detections_are_deduplicated_across_adapters(pool):
+    devices = asyncio.run(bleExp.scanMatchingDevices(None, None, 0, pool))
+    assert sorted(device.address for device in devices) == ["AA:01", "AA:02", "AA:03"]
+
+
+def test_seen_by_records_rssi_and_count_per_adapter(pool):
+    asyncio.run(bleExp.scanMatchingDevices(None, None, 0, pool))
+    assert pool.seenBy("aa:01") == [("hci1", -60, 1), ("hci0", -81, 2)]
+    assert pool.seenBy("AA:02") == [("hci0", -50, 1)]
+    assert pool.seenBy("AA:99") == []
+
+
+def test_failed_adapter_is_left_out(pool):
+    async def scan():
+        scanners, errors = await bleExp.startScanners(lambda device, advertisement: None, pool)
+        await bleExp.stopScanners(scanners)
+        return errors
+    errors = asyncio.run(scan())
+    assert len(errors) == 1 and errors[0].startswith("hci2:")
+    assert pool.available == ["hci0", "hci1"]
+
+
+def test_acquire_places_connections_on_least_loaded_adapter(pool):
+    asyncio.run(bleExp.scanMatchingDevices(None, None, 0, pool))
+    # Both adapters saw AA:01: strongest RSSI first, then the least-loaded one
+    adapter, device = pool.acquire("AA:01")
+    assert adapter == "hci1" and device.adapter == "hci1"
+    assert pool.acquire("AA:01")[0] == "hci0"
+    assert pool.acquire("AA:01")[0] == "hci1"
+    # Only hci0 saw AA:02, even though it is as loaded as hci1
+    assert pool.acquire("AA:02")[0] == "hci0"
+    # Devices seen by no adapter go to the least-loaded working adapter
+    assert pool.acquire("AA:99") == ("hci0", None)
+    assert pool.connections == {"hci0": 3, "hci1": 2, "hci2": 0}
+    pool.release("hci0")
+    pool.release("hci0")
+    assert pool.acquire("AA:01")[0] == "hci0"
+
+
+def test_sweep_spreads_connections_and_releases_them(pool):
+    pool.available = ["hci0", "hci1"]
+
+    async def sweep():
+        return await asyncio.gather(*(bleExp.sweepDevice(f"CC:{i}", 1, 0, 1, pool) for i in range(6)))
+    records = asyncio.run(sweep())
+    assert all(record["ok"] for record in records)
+    assert sorted(record["adapter"] for record in records) == ["hci0"] * 3 + ["hci1"] * 3
+    assert [client.adapter for client in FakeClient.instances] == [record["adapter"] for record in records]
+    # Devices given by address are found by the scanner of the adapter placing the connection
+    for client in FakeClient.instances:
+        assert isinstance(client.device, FakeDevice)
+        assert (client.device.name, client.device.adapter) == ("Found", client.adapter)
+    assert pool.connections == {"hci0": 0, "hci1": 0, "hci2": 0}
+
+
+def test_sweep_connects_with_the_device_found_by_the_chosen_adapter(pool):
+    devices = asyncio.run(bleExp.scanMatchingDevices(None, None, 0, pool))
+    targets = sorted(devices, key=lambda device: device.address)
+    records = [asyncio.run(bleExp.sweepDevice(target, 1, 0, 1, pool)) for target in targets]
+    assert [record["adapter"] for record in records] == ["hci1", "hci0", "hci1"]
+    for record, client in zip(records, FakeClient.instances):
+        assert client.device is pool.sightings[record["address"]][record["adapter"]][0]
+
+
+def test_sweep_connects_with_the_given_device_when_no_adapter_saw_it(pool):
+    pool.available = ["hci0", "hci1"]
+    device = FakeDevice("DD:01", "Given", "hci9")
+    record = asyncio.run(bleExp.sweepDevice(device, 1, 0, 1, pool))
+    assert record["ok"] and record["name"] == "Given"
+    assert FakeClient.instances[0].device is device and FakeClient.instances[0].adapter == record["adapter"]
@@ -0,0 +1,32 @@
+"""Decoding of advertisement data by the registered parsers"""
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("bleak")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bleExp  # noqa: E402
+
+
+class FakeAdvertisement:
+    def __init__(self, manufacturer_data=None, service_data=None):
+        self.manufacturer_data = manufacturer_data or {}
+        self.service_data = service_data or {}
+
+
+def test_entry_without_format_is_labelled_with_its_parser(monkeypatch):
+    def parseThermometer(data):
+        return {"temp": data[0]}
+    monkeypatch.setitem(bleExp.manufacturerDataParsers, 0xfff0, parseThermometer)
+    decoded = bleExp.decodeAdvertisement(FakeAdvertisement({0xfff0: b"\x05"}))
+    assert decoded == [{"temp": 5, "format": "parseThermometer", "source": "mfr 0xfff0"}]
+
+
+def test_failing_parser_gives_a_decode_error(monkeypatch):
+    def parseBroken(data):
+        raise KeyError("oops")
+    monkeypatch.setitem(bleExp.serviceDataParsers, "0000fff1-0000-1000-8000-00805f9b34fb", parseBroken)
+    decoded = bleExp.decodeAdvertisement(FakeAdvertisement(service_data={"0000fff1-0000-1000-8000-00805f9b34fb": b"\x01"}))
+    assert len(decoded) == 1 and decoded[0]["format"] == "decode error"
+    assert decoded[0]["error"].startswith("KeyError")
@@ -0,0 +1,34 @@
+"""Sequence gap counting of the throughput test"""
+import os
+import struct
+import sys
+
+import pytest
+
+pytest.importorskip("bleak")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bleExp  # noqa: E402
+
+
+def feed(seqSpec, counters):
+    stats = bleExp.ThroughputStats(seqSpec)
+    stats.start = 0
+    fmt = seqSpec.partition("@")[0]
+    for i, counter in enumerate(counters):
+        stats.add(struct.pack(fmt, counter), (i + 1) * 1000000)
+    return stats.result()
+
+
+def test_late_packet_fills_its_gap():
+    result = feed("<H", [0, 1, 2, 5, 6, 4, 7])
+    assert (result["lost"], result["out_of_order"], result["loss_pct"]) == (1, 1, 12.5)
+
+
+def test_duplicate_is_not_counted_as_received():
+    result = feed("<H", [0, 1, 2, 2, 4])
+    assert (result["lost"], result["out_of_order"], result["loss_pct"]) == (1, 1, 20.0)
+
+
+def test_gap_across_counter_wrap_around():
+    result = feed("<B", [253, 254, 1, 255, 2])
+    assert (result["lost"], result["out_of_order"]) == (1, 1)